@@ -1,26 +1,53 @@
 import streamlit as st
 import streamlit.components.v1 as components
-from groq import Groq
+from groq import Groq, Timeout as GroqTimeout
 import requests
 from fpdf import FPDF
+from geopy.distance import geodesic
+from PIL import Image, ImageOps
 from tavily import TavilyClient
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 import PyPDF2
 import base64
 import edge_tts
 import asyncio
+import atexit
 import tempfile
 import json
 import os
+import pickle
+import queue
 import hashlib
+import io
+import random
+import re
+import sqlite3
+import stat
+import threading
+import time
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache, wraps
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # ============================================================
 # PAGE CONFIG & INITIAL SETUP
 # ============================================================
 st.set_page_config(page_title="Ultimate Planner & Tourism Guide", page_icon="🌍", layout="wide")
+RERUN_STARTED = time.perf_counter()
 
 # ============================================================
 # (Rest of your original code follows exactly as before)
@@ -557,10 +584,17 @@ except KeyError:
 
 # Tourism Config
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DATA_SNAPSHOT_PATH = os.path.join(DATA_DIR, "snapshot.pickle")  # written by build_snapshot.py
+DATA_SNAPSHOT_FORMAT = 1
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
 OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+OPENWEATHER_URL = "http://api.openweathermap.org/data/2.5"
+DEEPSEEK_URL = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_MODEL = "deepseek-chat"
+WEATHER_CURRENT_FIELDS = "temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code"
+WEATHER_DAILY_FIELDS = "temperature_2m_max,temperature_2m_min,precipitation_sum,weather_code"
 TOURISM_SYSTEM_PROMPT = """You are the Pakistan Tourism Smart Assistant, an expert AI guide specializing exclusively in Pakistan tourism. You help tourists with:
 - Travel safety advice specific to Pakistani regions
 - Cultural guidance, local customs, dress codes, and etiquette
@@ -575,6 +609,598 @@ Rules:
 4. Mention emergency numbers when discussing safety: Police 15, Rescue 1122, Edhi 115.
 """
 
+# Cache Config (overridable through secrets.toml)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+WEATHER_CACHE_TTL = int(st.secrets.get("weather_cache_ttl", 1800))
+CACHE_FLUSH_INTERVAL = float(st.secrets.get("cache_flush_interval", 5))  # seconds between writes of a persisted cache
+WEATHER_CACHE_MAX_ENTRIES = int(st.secrets.get("weather_cache_max_entries", 512))
+CITY_WEATHER_CACHE_TTL = int(st.secrets.get("city_weather_cache_ttl", 600))
+TAVILY_CACHE_TTL = int(st.secrets.get("tavily_cache_ttl", 6 * 3600))
+WEATHER_PREFETCH_INTERVAL = float(st.secrets.get("weather_prefetch_interval", 900))
+WEATHER_PREFETCH_JITTER = float(st.secrets.get("weather_prefetch_jitter", 0.1))  # fraction of the interval
+WEATHER_PREFETCH_BATCH = int(st.secrets.get("weather_prefetch_batch", 50))
+OPEN_METEO_RATE_PER_MIN = float(st.secrets.get("open_meteo_rate_per_min", 300))  # locations per minute
+TAVILY_MAX_RESULTS = int(st.secrets.get("tavily_max_results", 3))
+TAVILY_MAX_CHARS = int(st.secrets.get("tavily_max_chars", 1500))  # cap on search text pasted into prompts
+LLM_CACHE_TTL = int(st.secrets.get("llm_cache_ttl", 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(st.secrets.get("llm_cache_max_bytes", 50 * 1024 * 1024))
+# Health Companion prompts carry the user's conditions and symptoms; keep them out of the on-disk cache unless opted in
+LLM_CACHE_HEALTH = str(st.secrets.get("llm_cache_health", "false")).lower() == "true"
+FX_PROVIDER = str(st.secrets.get("fx_provider", "http")).lower()  # "static" uses the template rates only
+FX_RATES_URL = st.secrets.get("fx_rates_url", "https://open.er-api.com/v6/latest/PKR")  # stub: python stub_servers.py rates
+FX_CACHE_TTL = int(st.secrets.get("fx_cache_ttl", 6 * 3600))
+TILE_PROXY_URL = st.secrets.get("tile_proxy_url", "").rstrip("/")  # python tile_proxy.py serve; empty loads tiles directly
+# Thumbnails live in Streamlit's static folder (enableStaticServing in .streamlit/config.toml)
+THUMB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "thumbs")
+THUMB_URL_PREFIX = "app/static/thumbs"
+THUMB_WIDTHS = (320, 640, 960)
+THUMB_QUALITY = int(st.secrets.get("thumb_quality", 72))
+FONTS_CSS_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap"
+TOURISM_STORE_ENABLED = str(st.secrets.get("tourism_store", "sqlite")).lower() == "sqlite"  # "json" disables it
+TOURISM_DB_PATH = st.secrets.get("tourism_db_path", os.path.join(CACHE_DIR, "tourism.sqlite3"))
+
+# HTTP Client Config: endpoint -> (connect, read) timeouts in seconds and retry budget
+HTTP_ENDPOINTS = {
+    "openweather": {"timeout": (3.05, 10), "retries": 2},
+    "open_meteo": {"timeout": (3.05, 10), "retries": 2},
+    "deepseek": {"timeout": (5, 30), "retries": 1},  # POST: retried only when the request never reached the server
+    "groq": {"timeout": (5, 30), "retries": 0},  # applied to the Groq SDK client; the router fails over instead
+    "fx": {"timeout": (3.05, 8), "retries": 2},
+    "images": {"timeout": (3.05, 20), "retries": 1},
+    "default": {"timeout": (3.05, 15), "retries": 1},
+}
+HTTP_HOST_CONCURRENCY = int(st.secrets.get("http_host_concurrency", 8))
+HTTP_POOL_SIZE = int(st.secrets.get("http_pool_size", 16))
+IO_WORKERS = int(st.secrets.get("io_workers", 16))
+STREAM_RENDER_INTERVAL = 0.08  # seconds between redraws of a streaming reply
+
+# AI Router Config: hedge to the next provider once the first token is later than the primary's p95
+AI_HEDGE_MIN_DELAY = float(st.secrets.get("ai_hedge_min_delay", 1.5))
+AI_HEDGE_DEFAULT_DELAY = float(st.secrets.get("ai_hedge_default_delay", 8.0))
+AI_BREAKER_ERROR_RATE = float(st.secrets.get("ai_breaker_error_rate", 0.5))
+AI_BREAKER_COOLDOWN = float(st.secrets.get("ai_breaker_cooldown", 30))
+AI_STREAM_STALL_TIMEOUT = float(st.secrets.get("ai_stream_stall_timeout", 30))  # seconds without a chunk before failing over
+
+# ============================================================
+# SHARED CACHES (process-wide, survive reruns and sessions)
+# ============================================================
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl` seconds.
+    When `persist_path` is given the entries are written to a JSON file
+    so a restarted process starts warm. Keys must be strings. Writes are
+    batched: a change marks the cache dirty and a timer flushes it at most
+    once per `flush_interval` seconds, serializing outside the lock.
+    """
+    def __init__(self, ttl, max_entries=256, persist_path=None, flush_interval=CACHE_FLUSH_INTERVAL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # one writer of the file at a time
+        self._dirty = False
+        self._timer = None
+        self._last_flush = 0.0
+        if persist_path:
+            self._load()
+            atexit.register(self.flush)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._mark_dirty()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+            self._mark_dirty()
+
+    def flush(self):
+        """Write pending changes now; a no-op when nothing changed since the last write."""
+        with self._write_lock:  # snapshot under the writer lock so an older snapshot never lands last
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                entries = [[k, exp, v] for k, (exp, v) in self._data.items()]
+                self._dirty = False
+                self._last_flush = time.time()
+            self._save(entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        now = time.time()
+        for key, expires_at, value in entries[-self.max_entries:]:
+            if expires_at > now:
+                self._data[key] = (expires_at, value)
+
+    def _mark_dirty(self):
+        # Caller holds self._lock
+        if not self.persist_path:
+            return
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(max(0.0, self._last_flush + self.flush_interval - time.time()), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _save(self, entries):
+        try:
+            os.makedirs(os.path.dirname(self.persist_path), exist_ok=True)
+            tmp_path = self.persist_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.persist_path)
+        except OSError:
+            pass  # persistence is best-effort; the in-memory cache still works
+
+@st.cache_resource
+def get_weather_cache():
+    return TTLCache(WEATHER_CACHE_TTL, WEATHER_CACHE_MAX_ENTRIES, os.path.join(CACHE_DIR, "weather_tourism.json"))
+
+@st.cache_resource
+def get_city_weather_cache():
+    return TTLCache(CITY_WEATHER_CACHE_TTL, 256, os.path.join(CACHE_DIR, "city_weather.json"))
+
+@st.cache_resource
+def get_tavily_cache():
+    return TTLCache(TAVILY_CACHE_TTL, 256, os.path.join(CACHE_DIR, "tavily_search.json"))
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into one execution whose result they all receive."""
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+@st.cache_resource
+def get_search_flights():
+    return SingleFlight()
+
+class LLMResponseCache:
+    """
+    Content-addressed SQLite cache of chat completions. The key is a hash
+    of the provider, model and normalized message list; entries expire
+    after `ttl` seconds and the least recently used ones are evicted once
+    the stored text exceeds `max_bytes`. Hit/miss and saved-token counters
+    are persisted alongside the entries.
+    """
+    def __init__(self, path, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, provider TEXT, model TEXT, response TEXT,
+            tokens INTEGER, size INTEGER, created_at REAL, accessed_at REAL)""")
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(provider, model, messages):
+        normalized = [
+            {"role": m["role"].strip().lower(), "content": " ".join(m["content"].split()) if isinstance(m["content"], str) else m["content"]}
+            for m in messages
+        ]
+        blob = json.dumps({"provider": provider, "model": model, "messages": normalized}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def lookup(self, messages, candidates):
+        """Return the cached reply for the first (provider, model) in `candidates` that has one."""
+        now = time.time()
+        try:
+            with self._lock:
+                for provider, model in candidates:
+                    key = self.make_key(provider, model, messages)
+                    row = self._db.execute("SELECT response, tokens, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                    if row and row[2] + self.ttl > now:
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._bump(hits=1, saved_tokens=row[1])
+                        self._db.commit()
+                        return row[0]
+                self._bump(misses=1)
+                self._db.commit()
+        except sqlite3.Error:
+            pass  # a locked or corrupt cache just means asking the provider
+        return None
+
+    def store(self, provider, model, messages, response, tokens=None):
+        if not response:
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if tokens is None:
+            # ~4 characters per token is close enough for reporting
+            tokens = (sum(len(str(m["content"])) for m in messages) + len(response)) // 4
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.make_key(provider, model, messages), provider, model, response, tokens, size, now, now)
+                )
+                self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+                self._evict()
+                self._db.commit()
+        except sqlite3.Error:
+            pass  # a failed write only costs a future cache miss
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _bump(self, **deltas):
+        for name, delta in deltas.items():
+            self._db.execute(
+                "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, delta)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.execute("DELETE FROM counters")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "saved_tokens": counters.get("saved_tokens", 0),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+@st.cache_resource
+def get_llm_cache():
+    return LLMResponseCache(os.path.join(CACHE_DIR, "llm_responses.sqlite3"), LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+
+# ============================================================
+# SHARED HTTP CLIENT (pooled, timeout-bounded outbound calls)
+# ============================================================
+class HttpClient:
+    """
+    One keep-alive session per host with a bounded connection pool.
+    Every request gets its endpoint's (connect, read) timeout, transient
+    failures are retried with full-jitter exponential backoff, and a
+    per-host semaphore caps how many requests are in flight at once.
+    Non-idempotent methods (POST) are retried only when the request
+    provably never ran: a failed connect or a 429.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+    def __init__(self, endpoints, host_concurrency=8, pool_size=16, backoff_base=0.5, backoff_cap=8.0):
+        self.endpoints = endpoints
+        self.host_concurrency = host_concurrency
+        self.pool_size = pool_size
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._sessions = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._slots[host] = threading.BoundedSemaphore(self.host_concurrency)
+            return self._sessions[host], self._slots[host]
+
+    def _backoff(self, attempt, resp=None):
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _never_sent(exc):
+        """True when the connection failed before any bytes of the request went out."""
+        if isinstance(exc, requests.ConnectTimeout):
+            return True
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def request(self, method, url, endpoint="default", **kwargs):
+        config = self.endpoints.get(endpoint, self.endpoints["default"])
+        kwargs.setdefault("timeout", config["timeout"])
+        retries = config["retries"]
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        session, slots = self._host(url)
+        for attempt in range(retries + 1):
+            resp = None
+            try:
+                with slots:
+                    resp = session.request(method, url, **kwargs)
+                retryable = resp.status_code in self.RETRY_STATUSES if idempotent else resp.status_code == 429
+                if not retryable or attempt == retries:
+                    return resp
+                resp.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == retries or not (idempotent or self._never_sent(e)):
+                    raise
+            time.sleep(self._backoff(attempt, resp))
+
+    def get(self, url, endpoint="default", **kwargs):
+        return self.request("GET", url, endpoint, **kwargs)
+
+    def post(self, url, endpoint="default", **kwargs):
+        return self.request("POST", url, endpoint, **kwargs)
+
+@st.cache_resource
+def get_http_client():
+    return HttpClient(HTTP_ENDPOINTS, HTTP_HOST_CONCURRENCY, HTTP_POOL_SIZE)
+
+@st.cache_resource
+def get_io_executor():
+    return ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+def run_in_background(fn, *args, **kwargs):
+    """Submit fn to the shared I/O pool with the current script context attached."""
+    ctx = get_script_run_ctx()
+    def task():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    return get_io_executor().submit(task)
+
+def run_in_thread(fn, *args, **kwargs):
+    """
+    Run fn on its own daemon thread with the current script context attached.
+    For stream pumps: they wait on other I/O for the whole reply, so holding a
+    slot in the bounded I/O pool could starve the very tasks they wait on.
+    """
+    thread = threading.Thread(target=fn, args=args, kwargs=kwargs, name="stream-pump", daemon=True)
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return thread
+
+# ============================================================
+# PERFORMANCE TELEMETRY (process-wide timing samples)
+# ============================================================
+class PerfRecorder:
+    """Rolling window of timing samples per label, reported as p50/p95 in the admin console."""
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds):
+        with self._lock:
+            self._samples.setdefault(label, deque(maxlen=self.window)).append(seconds)
+
+    def stats(self):
+        with self._lock:
+            snapshot = {label: sorted(samples) for label, samples in self._samples.items()}
+        return {
+            label: {"count": len(s), "p50": s[len(s) // 2], "p95": s[min(len(s) - 1, int(len(s) * 0.95))], "max": s[-1]}
+            for label, s in sorted(snapshot.items()) if s
+        }
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+@st.cache_resource
+def get_perf_recorder():
+    return PerfRecorder()
+
+@st.cache_resource(max_entries=64)
+def _cached_figure(kind, version, subject, theme, _build):
+    started = time.perf_counter()
+    fig = _build()
+    get_perf_recorder().record(f"Chart build · {kind}", time.perf_counter() - started)
+    return fig
+
+def plotly_cached(kind, version, subject, build):
+    """st.plotly_chart for a figure built once per (kind, data version, subject, theme).
+
+    The cached go.Figure is handed to Streamlit as is: it serializes a copy, and unlike a
+    dict or JSON spec it isn't re-validated through plotly on every render.
+    """
+    started = time.perf_counter()
+    fig = _cached_figure(kind, version, subject, st.session_state.theme, build)
+    st.plotly_chart(fig, use_container_width=True)
+    get_perf_recorder().record(f"Chart render · {kind}", time.perf_counter() - started)
+
+def timed_fragment(fn):
+    """st.fragment whose widget-triggered reruns are recorded as "Fragment · <name>".
+
+    Full-script reruns are recorded separately as "Rerun · <section>", so the two
+    labels give interaction latency with and without fragment scoping.
+    """
+    @wraps(fn)
+    def run(*args, **kwargs):
+        started = time.perf_counter()
+        fn(*args, **kwargs)
+        ctx = get_script_run_ctx()
+        if ctx and ctx.fragment_ids_this_run:
+            get_perf_recorder().record(f"Fragment · {fn.__name__}", time.perf_counter() - started)
+    return st.fragment(run)
+
+# ============================================================
+# BACKGROUND WEATHER PREFETCH (keeps every destination warm)
+# ============================================================
+class TokenBucket:
+    """Blocking token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n=1):
+        n = min(n, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+
+class WeatherPrefetcher:
+    """
+    Daemon thread that refreshes weather for every catalogued destination
+    every `interval` seconds (plus/minus `jitter`), in batched Open-Meteo
+    calls paced by a shared rate limiter. Failed rounds back off
+    exponentially. Pages read the warm store and never block on the network.
+    """
+    def __init__(self, load_destinations, interval, jitter, batch_size, limiter):
+        self.load_destinations = load_destinations
+        self.interval = interval
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.limiter = limiter
+        self.failures = 0
+        self.last_refresh = None
+        self.last_error = None
+        self._next_early_refresh = 0.0
+        self._store = {}  # name -> (weather data, fetched_at)
+        self._lock = threading.Lock()
+        self._warm = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="weather-prefetch", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._store)
+
+    def wait_until_warm(self, timeout):
+        return self._warm.wait(timeout)
+
+    def refresh_missing(self, dest):
+        """Start an early round for a destination with coordinates but no data yet, at most once per backoff window."""
+        if "latitude" not in dest or "longitude" not in dest:
+            return False
+        with self._lock:
+            if dest["name"] in self._store or time.time() < self._next_early_refresh:
+                return False
+            self._next_early_refresh = time.time() + self._backoff()
+        self._wake.set()
+        return True
+
+    def _backoff(self):
+        return min(self.interval, 5 * 2 ** self.failures)
+
+    def _refresh(self):
+        dests = [d for d in self.load_destinations() if "latitude" in d and "longitude" in d]
+        for i in range(0, len(dests), self.batch_size):
+            batch = dests[i:i + self.batch_size]
+            self.limiter.acquire(len(batch))
+            fetched = fetch_weather_batch(batch, force=True)
+            now = time.time()
+            with self._lock:
+                for name, data in fetched.items():
+                    self._store[name] = (data, now)
+
+    def _run(self):
+        while True:
+            try:
+                self._refresh()
+                self.failures = 0
+                self.last_refresh = time.time()
+                self.last_error = None
+                delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)[:200]
+                delay = self._backoff() * random.uniform(0.5, 1.0)
+            self._warm.set()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+@st.cache_resource
+def get_weather_prefetcher():
+    limiter = TokenBucket(OPEN_METEO_RATE_PER_MIN / 60.0, max(1, WEATHER_PREFETCH_BATCH))
+    return WeatherPrefetcher(get_destination_catalog().all, WEATHER_PREFETCH_INTERVAL, WEATHER_PREFETCH_JITTER, WEATHER_PREFETCH_BATCH, limiter).start()
+
+def format_age(seconds):
+    if seconds < 90: return f"{int(seconds)}s ago"
+    if seconds < 5400: return f"{int(seconds // 60)} min ago"
+    return f"{seconds / 3600:.1f} h ago"
+
 # ============================================================
 # INITIALIZE STATE
 # ============================================================
@@ -599,6 +1225,11 @@ if "current_tourism_module" not in st.session_state:
 if "planner_module" not in st.session_state:
     st.session_state.planner_module = "📋 Dashboard"
 
+# Top-level navigation: only the selected section's code runs on a rerun
+APP_SECTIONS = ["👋 Welcome", "📅 Trip Planner", "🤖 Health Companion", "🇵🇰 Pakistan Tourism"]
+if "active_section" not in st.session_state:
+    st.session_state.active_section = APP_SECTIONS[0]
+
 # NEW STATE FOR HEALTH COMPANION QUESTIONNAIRE
 if "disease_info" not in st.session_state:
     st.session_state.disease_info = None
@@ -636,36 +1267,62 @@ def update_planner_module():
 def update_tourism_module():
     st.session_state.current_tourism_module = st.session_state.tourism_nav
 
+def update_active_section():
+    st.session_state.active_section = st.session_state.section_nav
+
 # ============================================================
 # HEALTH & PLANNER FUNCTIONS
 # ============================================================
-def get_current_weather(city, api_key):
-    try:
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-        response = requests.get(url).json()
-        if response.get("cod") != 200: return None, "Error"
-        main = response["main"]
-        return {"desc": response["weather"][0]["description"], "temp": main["temp"], "humidity": main["humidity"], "feels_like": main["feels_like"]}, None
-    except: return None, "Error"
-
-def get_forecast(city, api_key):
-    try:
-        url = f"http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={api_key}&units=metric"
-        res = requests.get(url).json()
-        if res.get("cod") != "200": return None
-        data = []
-        for i in res['list']:
-            dt = pd.to_datetime(i['dt_txt'])
-            day_night = "Day ☀️" if 6 <= dt.hour < 18 else "Night 🌙"
-            data.append({"Datetime": i['dt_txt'], "Date": dt.strftime('%Y-%m-%d'), "Time": dt.strftime('%I:%M %p'), "Period": day_night, "Temperature (°C)": i['main']['temp'], "Rain Chance (%)": int(i.get('pop', 0) * 100), "Condition": i['weather'][0]['description'].title()})
-        return pd.DataFrame(data)
-    except: return None
-
-def search_tavily(query):
+def get_city_weather(city, api_key):
+    """
+    Current conditions and the 5-day forecast for a city from a single
+    OpenWeather /forecast call: the 3-hour slot whose time is closest to
+    now stands in for the current snapshot. Responses are cached per city.
+    Returns (current dict or None, forecast DataFrame or None).
+    """
+    key = " ".join(city.lower().split())
+    cache = get_city_weather_cache()
+    res = cache.get(key)
+    if res is None:
+        try:
+            params = {"q": city, "appid": api_key, "units": "metric"}
+            res = get_http_client().get(f"{OPENWEATHER_URL}/forecast", endpoint="openweather", params=params).json()
+        except: return None, None
+        if str(res.get("cod")) != "200" or not res.get("list"): return None, None
+        cache.set(key, res)
+    now = time.time()
+    slot = min(res['list'], key=lambda i: abs(i['dt'] - now))
+    current = {"desc": slot["weather"][0]["description"], "temp": slot["main"]["temp"], "humidity": slot["main"]["humidity"], "feels_like": slot["main"]["feels_like"]}
+    data = []
+    for i in res['list']:
+        dt = pd.to_datetime(i['dt_txt'])
+        day_night = "Day ☀️" if 6 <= dt.hour < 18 else "Night 🌙"
+        data.append({"Datetime": i['dt_txt'], "Date": dt.strftime('%Y-%m-%d'), "Time": dt.strftime('%I:%M %p'), "Period": day_night, "Temperature (°C)": i['main']['temp'], "Rain Chance (%)": int(i.get('pop', 0) * 100), "Condition": i['weather'][0]['description'].title()})
+    return current, pd.DataFrame(data)
+
+@st.cache_resource
+def get_tavily_client():
+    return TavilyClient(api_key=TAVILY_KEY)
+
+def search_tavily(query, max_results=TAVILY_MAX_RESULTS, max_chars=TAVILY_MAX_CHARS):
+    # Same query (case/whitespace-insensitive) is answered from cache; concurrent ones share a single call
+    key = f"{' '.join(query.lower().split())}|{max_results}|{max_chars}"
+    cache = get_tavily_cache()
+    cached = cache.get(key)
+    if cached is not None: return cached
+    def lookup():
+        res = get_tavily_client().search(query=query, max_results=max_results)
+        lines, size = [], 0
+        for r in res['results'][:max_results]:
+            line = f"- {r['title']}: {r['url']}"
+            if size + len(line) > max_chars: break
+            lines.append(line)
+            size += len(line) + 1
+        text = "\n".join(lines) or "No results."
+        cache.set(key, text)
+        return text
     try:
-        tavily = TavilyClient(api_key=TAVILY_KEY)
-        res = tavily.search(query=query, max_results=3)
-        return "\n".join([f"- {r['title']}: {r['url']}" for r in res['results']])
+        return get_search_flights().do(key, lookup)
     except: return "No results."
 
 def extract_pdf(file):
@@ -697,65 +1354,1337 @@ def create_pdf(text):
     return pdf.output(dest='S').encode('latin-1')
 
 # ============================================================
-# DUAL AI FUNCTION FOR HEALTH COMPANION (unchanged)
+# DUAL AI ROUTING (Groq first, DeepSeek as hedge / fallback)
 # ============================================================
-def get_ai_response(messages, model="llama-3.3-70b-versatile"):
+@st.cache_resource
+def get_groq_client():
+    # Same budget as the HttpClient endpoints; the SDK default (600 s, 2 retries) could block a reply for minutes
+    connect, read = HTTP_ENDPOINTS["groq"]["timeout"]
+    return Groq(api_key=GROQ_KEY, timeout=GroqTimeout(read, connect=connect), max_retries=HTTP_ENDPOINTS["groq"]["retries"])
+
+def _groq_stream(messages, model, cancel):
+    stream = cancel.attach(get_groq_client().chat.completions.create(messages=messages, model=model, stream=True))
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+def _deepseek_request(messages, stream=False):
+    # DeepSeek API call (assuming OpenAI-compatible endpoint)
+    headers = {
+        "Authorization": f"Bearer {DEEPSEEK_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": DEEPSEEK_MODEL,
+        "messages": messages,
+        "temperature": 0.7,
+        "stream": stream
+    }
+    return get_http_client().post(DEEPSEEK_URL, endpoint="deepseek", headers=headers, json=payload, stream=stream)
+
+def _deepseek_stream(messages, model, cancel):
+    with cancel.attach(_deepseek_request(messages, stream=True)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+class StreamEvent:
+    """Out-of-band notice inside a reply stream; `reset` discards the text streamed so far."""
+    def __init__(self, level, message, reset=False):
+        self.level = level
+        self.message = message
+        self.reset = reset
+
+class StreamCancel:
+    """
+    Cancellation flag for one provider call. Setting it also closes the
+    response the call attached, so a pump blocked on a read ends now rather
+    than when its next delta arrives.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._resource = None
+
+    def attach(self, resource):
+        with self._lock:
+            self._resource = resource
+            cancelled = self._event.is_set()
+        if cancelled:
+            self._close(resource)
+        return resource
+
+    def set(self):
+        with self._lock:
+            self._event.set()
+            resource, self._resource = self._resource, None
+        if resource is not None:
+            self._close(resource)
+
+    def is_set(self):
+        return self._event.is_set()
+
+    @staticmethod
+    def _close(resource):
+        try:
+            resource.close()
+        except Exception:
+            pass  # races the pump's own read; all that matters is that the read ends
+
+class ProviderHealth:
+    """
+    Rolling window of time-to-first-token latencies and outcomes for one
+    backend, plus a circuit breaker: it opens when the error rate over the
+    window reaches `error_rate`, lets a single trial through after
+    `cooldown` seconds (half-open) and closes again on success. The breaker
+    only goes half-open when a call is actually launched, and a trial that is
+    cancelled before it has an outcome re-opens it for another cooldown.
+    """
+    def __init__(self, window=50, error_rate=0.5, min_samples=5, cooldown=30.0):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.error_rate_limit = error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def available(self):
+        with self._lock:
+            return self.state == "closed" or (self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown)
+
+    def launch(self):
+        """A call is starting on this backend: a cooled-down open breaker becomes the half-open trial."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+
+    def release(self):
+        """A launched call was cancelled before its first token, so it never settled the trial."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def record(self, ok, latency):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+                self.state = "closed"
+            elif self.state == "half_open" or (len(self.outcomes) >= self.min_samples and self._error_rate() >= self.error_rate_limit):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def _error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def p95(self, default):
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return default
+            ordered = sorted(self.latencies)
+            return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "error_rate": self._error_rate(), "samples": len(self.outcomes)}
+
+class ProviderRouter:
+    """
+    Streams a completion from the first healthy provider. If its first token
+    is later than that provider's p95 time-to-first-token, the next provider
+    is started as a hedge and whichever answers first wins; the other is
+    cancelled. A provider that errors, or sends nothing for `stall_timeout`
+    seconds, hands over to the next one, exactly like the old Groq -> DeepSeek
+    fallback.
+    """
+    def __init__(self, providers, hedge_min_delay, hedge_default_delay, error_rate, cooldown, stall_timeout=30.0):
+        self.providers = providers  # name -> (label, stream_fn(messages, model, cancel), model_for)
+        self.health = {name: ProviderHealth(error_rate=error_rate, cooldown=cooldown) for name in providers}
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.stall_timeout = stall_timeout
+        self.hedges = 0
+        self._live = 0  # pump threads that have not exited yet
+        self._lock = threading.Lock()
+
+    def model_for(self, name, model):
+        return self.providers[name][2](model)
+
+    def _order(self):
+        healthy = [name for name in self.providers if self.health[name].available()]
+        return healthy or list(self.providers)
+
+    def live_calls(self):
+        with self._lock:
+            return self._live
+
+    def _pump(self, name, messages, model, out, cancel):
+        health, start, first = self.health[name], time.monotonic(), True
+        with self._lock:
+            self._live += 1
+        try:
+            for delta in self.providers[name][1](messages, self.model_for(name, model), cancel):
+                if cancel.is_set():
+                    if first:
+                        health.release()
+                    return
+                if first:
+                    health.record(True, time.monotonic() - start)
+                    first = False
+                out.put((name, "chunk", delta))
+            if first:
+                health.record(True, time.monotonic() - start)
+            out.put((name, "done", None))
+        except Exception as e:
+            if not cancel.is_set():
+                health.record(False, time.monotonic() - start)
+            elif first:
+                health.release()
+            out.put((name, "error", e))
+        finally:
+            with self._lock:
+                self._live -= 1
+
+    def stream(self, messages, model, meta=None):
+        """Yield reply chunks and StreamEvents; meta["source"] is set to the winning provider."""
+        out = queue.Queue()
+        pending = self._order()
+        running = {}  # name -> StreamCancel, for pumps that are still live
+        errors = {}
+        winner = None
+
+        def launch():
+            name = pending.pop(0)
+            running[name] = StreamCancel()
+            self.health[name].launch()
+            run_in_thread(self._pump, name, messages, model, out, running[name])
+            return time.monotonic() + max(self.hedge_min_delay, self.health[name].p95(self.hedge_default_delay))
+
+        hedge_at = launch()
+        try:
+            while True:
+                hedging = winner is None and pending
+                try:
+                    name, kind, payload = out.get(timeout=max(0.0, hedge_at - time.monotonic()) if hedging else self.stall_timeout)
+                except queue.Empty:
+                    if hedging:
+                        self.hedges += 1
+                        hedge_at = launch()
+                        continue
+                    # the winner (or, before one, the oldest call) went quiet: treat it as failed
+                    name = winner if winner is not None else next(iter(running))
+                    kind, payload = "error", TimeoutError(f"no data for {self.stall_timeout:.0f}s")
+                    self.health[name].record(False, self.stall_timeout)
+                if name not in running:
+                    continue  # leftovers from a cancelled pump
+                if kind == "chunk" or (kind == "done" and winner is None):
+                    if winner is None:
+                        winner = name
+                        if meta is not None:
+                            meta["source"] = name
+                        for other in [n for n in running if n != name]:
+                            running.pop(other).set()
+                    if kind == "done":
+                        return
+                    yield payload
+                elif kind == "done":
+                    return
+                else:
+                    errors[name] = payload
+                    running.pop(name).set()
+                    failed_mid_stream = name == winner
+                    winner = None
+                    if running and not failed_mid_stream:
+                        continue  # a hedge is already in flight
+                    if pending:
+                        yield StreamEvent("warning", f"{self.providers[name][0]} API failed: {str(payload)[:100]}. Falling back to {self.providers[pending[0]][0]}...", reset=failed_mid_stream)
+                        hedge_at = launch()
+                    else:
+                        details = ", ".join(f"{self.providers[n][0]}: {str(e)[:100]}" for n, e in errors.items())
+                        yield StreamEvent("error", f"Both AI services failed. {details}", reset=True)
+                        yield "I'm sorry, but I'm unable to process your request at the moment. Please try again later."
+                        if meta is not None:
+                            meta["source"] = None
+                        return
+        finally:
+            for cancel in running.values():
+                cancel.set()
+
+    def stats(self):
+        return {
+            name: dict(self.health[name].snapshot(), p95=self.health[name].p95(self.hedge_default_delay), label=self.providers[name][0])
+            for name in self.providers
+        }
+
+@st.cache_resource
+def get_ai_router():
+    return ProviderRouter(
+        {
+            "groq": ("Groq", _groq_stream, lambda model: model),
+            "deepseek": ("DeepSeek", _deepseek_stream, lambda model: DEEPSEEK_MODEL),
+        },
+        AI_HEDGE_MIN_DELAY, AI_HEDGE_DEFAULT_DELAY, AI_BREAKER_ERROR_RATE, AI_BREAKER_COOLDOWN, AI_STREAM_STALL_TIMEOUT
+    )
+
+def stream_ai_response(messages, model="llama-3.3-70b-versatile", use_cache=True, meta=None):
     """
-    Attempts to get response from Groq first.
-    If Groq fails, falls back to DeepSeek.
-    If both fail, returns an error message.
+    Yields reply text chunks as they arrive. The provider router picks
+    Groq first and hedges to / falls back on DeepSeek. Fallback and failure
+    notices are yielded as StreamEvent objects so the renderer can show
+    them on the script thread. Cached replies are yielded in one piece.
     """
-    # Try Groq first
+    router = get_ai_router()
+    cache = get_llm_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.lookup(messages, [(name, router.model_for(name, model)) for name in router.providers])
+        if cached is not None:
+            if meta is not None:
+                meta["source"] = "cache"
+            yield cached
+            return
+
+    meta = {} if meta is None else meta
+    parts = []
+    for chunk in router.stream(messages, model, meta):
+        if isinstance(chunk, StreamEvent) and chunk.reset:
+            parts = []
+        elif not isinstance(chunk, StreamEvent):
+            parts.append(chunk)
+        yield chunk
+    if cache is not None and meta.get("source"):
+        cache.store(meta["source"], router.model_for(meta["source"], model), messages, "".join(parts))
+
+def prefetch_stream(chunks):
+    """Start draining a chunk iterator on its own thread now; returns an iterator over what it buffers."""
+    buffer = queue.Queue()
+    done = object()
+    def pump():
+        try:
+            for chunk in chunks:
+                buffer.put(chunk)
+        finally:
+            buffer.put(done)
+    run_in_thread(pump)
+    def drain():
+        while (chunk := buffer.get()) is not done:
+            yield chunk
+    return drain()
+
+def render_ai_stream(chunks, transform=None, placeholder=None, html=False):
+    """Render a reply stream into `placeholder` as it arrives and return the raw text."""
+    placeholder = placeholder or st.empty()
+    transform = transform or (lambda t: t)
+    text, last_draw = "", 0.0
+    for chunk in chunks:
+        if isinstance(chunk, StreamEvent):
+            if chunk.reset:
+                text = ""
+            getattr(st, chunk.level)(chunk.message)
+            continue
+        text += chunk
+        if time.monotonic() - last_draw >= STREAM_RENDER_INTERVAL:
+            placeholder.markdown(transform(text) + " ▌", unsafe_allow_html=html)
+            last_draw = time.monotonic()
+    placeholder.markdown(transform(text), unsafe_allow_html=html)
+    return text
+
+# ============================================================
+# DESTINATION CATALOG (process-wide, indexed, mtime-invalidated)
+# ============================================================
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+
+def parse_season_months(season):
+    """'April - October' -> {4, ..., 10}; wraps across the new year ('October - March')."""
     try:
-        groq_client = Groq(api_key=GROQ_KEY)
-        response = groq_client.chat.completions.create(
-            messages=messages,
-            model=model
-        )
-        return response.choices[0].message.content, "groq"
-    except Exception as e:
-        st.warning(f"Groq API failed: {str(e)[:100]}. Falling back to DeepSeek...")
-        
-        # Fallback to DeepSeek
+        start, end = [MONTHS.index(part.strip().capitalize()) + 1 for part in season.split("-")]
+    except (AttributeError, ValueError):
+        return set()
+    if start <= end:
+        return set(range(start, end + 1))
+    return set(range(start, 13)) | set(range(1, end + 1))
+
+FALLBACK_DESTINATIONS = [
+    {
+        "name": "Hunza Valley",
+        "region": "Gilgit-Baltistan",
+        "access_level": "Moderate",
+        "latitude": 36.3167,
+        "longitude": 74.65,
+        "altitude_m": 2438,
+        "best_season": "April - October",
+        "budget_per_day": {"budget": 5000},
+        "description": "The Hunza Valley stands as one of Pakistan's most resplendent topographical marvels, ensconced by formidable snow-capped summits including Rakaposhi and Ultar Sar. The domain is globally recognized for its superlative landscapes, ancient fortified structures, and the profound hospitality of the indigenous populace.",
+        "history": "Historically functioning as an autonomous princely state for nearly a millennium under the sovereign rule of the Mir of Hunza, the region served as a pivotal node along the ancient Silk Route. It was fully integrated into the Federation of Pakistan in 1974. The territory is predominantly inhabited by the Burushaski-speaking demographic, utilizing a language isolate bereft of known genealogical affiliations.",
+        "landmarks": [{"name": "Baltit Fort", "description": "A heptacentennial fortress strategically positioned above Karimabad, currently functioning as a UNESCO-endorsed heritage conservatory."}],
+        "activities": ["High-altitude trekking and alpine ascents", "Historical fortification reconnaissance", "Nautical navigation across Attabad Lake"],
+        "transport": {"Islamabad": {"road": "14-16 hours via the Karakoram Highway corridor"}},
+        "accommodation": {"budget": ["Economical lodging facilities in Karimabad"], "luxury": ["Serena Hotel - Premium accommodations"]},
+        "connectivity": {"mobile_networks": ["SCOM (Optimal Infrastructure)", "Telenor"], "internet": "Broadband accessible in primary establishments", "tips": "Procurement of an SCOM cellular subscription in Gilgit is highly advised."},
+        "gallery_images": [
+            "https://images.unsplash.com/photo-1589553416260-f586c8f1514f?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1627896157734-4bc0a2b027b4?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1600100397608-f010f423b971?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1542358814-c18d1840801a?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1506905925346-21bda4d32df4?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1464822759023-fed622ff2c3b?auto=format&fit=crop&w=800&q=80"
+        ]
+    },
+    {
+        "name": "Skardu",
+        "region": "Gilgit-Baltistan",
+        "access_level": "Moderate",
+        "latitude": 35.2971,
+        "longitude": 75.6333,
+        "altitude_m": 2228,
+        "best_season": "May - September",
+        "budget_per_day": {"budget": 6000},
+        "description": "Serving as the principal gateway to the Karakoram's eight-thousanders, Skardu is a high-altitude sanctuary characterized by stark alpine deserts, cerulean lakes, and monumental geological formations.",
+        "history": "Capital of the historic Baltistan region, Skardu possesses a profoundly rich Tibetan-influenced heritage, often referred to as 'Little Tibet', manifesting in its architectural vernacular and local gastronomy.",
+        "landmarks": [{"name": "Kharpocho Fort", "description": "An ancient fortification offering panoramic surveillance of the Indus River."}],
+        "activities": ["High-altitude acclimatization", "Deosai National Park traversal", "Engagement with local Balti heritage"],
+        "transport": {"Islamabad": {"road": "20-22 hours via rigorous alpine routes", "air": "45-minute scenic aerial transit"}},
+        "accommodation": {"budget": ["Standard alpine guest houses"], "luxury": ["Shangrila Resort Skardu"]},
+        "connectivity": {"mobile_networks": ["SCOM", "Zong"], "internet": "Intermittent broadband within municipal limits", "tips": "Total telecommunication blackout expected in peripheral zones like Deosai."},
+        "gallery_images": [
+            "https://images.unsplash.com/photo-1621217036665-27a3c75eb2a7?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1595166373721-653557e4e164?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1633511116666-9eebc3f25b2d?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1454496522488-7a8e488e8606?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1469334031218-e382a71b716b?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1434394354979-a235cd36269d?auto=format&fit=crop&w=800&q=80"
+        ]
+    },
+    {
+        "name": "Swat Valley",
+        "region": "Khyber Pakhtunkhwa",
+        "access_level": "Easy",
+        "latitude": 35.2227,
+        "longitude": 72.4258,
+        "altitude_m": 980,
+        "best_season": "March - October",
+        "budget_per_day": {"budget": 4000},
+        "description": "Historically chronicled as the 'Switzerland of the East', the Swat Valley is an emerald expanse of dense coniferous forests, crystalline glacial rivers, and undulating meadows.",
+        "history": "A pivotal epicenter for early Buddhist civilization, the valley functions as a vast repository of ancient stupas and Gandharan archaeological artifacts.",
+        "landmarks": [{"name": "Malam Jabba", "description": "A premier high-altitude ski resort."}, {"name": "Butkara Stupa", "description": "A monumental relic of Gandharan antiquity."}],
+        "activities": ["Alpine skiing", "Trout fishing", "Archaeological expeditions"],
+        "transport": {"Islamabad": {"road": "4-5 hours via the Swat Motorway infrastructure"}},
+        "accommodation": {"budget": ["Mingora municipal lodgings"], "luxury": ["Serena Hotel Swat"]},
+        "connectivity": {"mobile_networks": ["Jazz", "Telenor", "Zong"], "internet": "Robust 4G LTE saturation in primary urban nodes", "tips": "Signal integrity diminishes in elevated extremities like Kalam."},
+        "gallery_images": [
+            "https://images.unsplash.com/photo-1624389964522-42171850119b?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1650367310574-12eb60f09a15?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1601931535038-1647a7b8e5c6?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1433086966358-54859d0ed716?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1472214103451-9374bd1c798e?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1501785888041-af3ef285b470?auto=format&fit=crop&w=800&q=80"
+        ]
+    },
+    {
+        "name": "Lahore",
+        "region": "Punjab",
+        "access_level": "Easy",
+        "latitude": 31.5204,
+        "longitude": 74.3587,
+        "altitude_m": 217,
+        "best_season": "October - March",
+        "budget_per_day": {"budget": 3000},
+        "description": "The undisputed cultural epicenter of the Republic, Lahore is a vibrant metropolis that seamlessly amalgamates majestic Mughal architecture with contemporary urban dynamism.",
+        "history": "Serving as the imperial capital for multiple dynasties, Lahore's historical tapestry is woven with the legacies of Mughal emperors, Sikh monarchs, and British colonial administrators.",
+        "landmarks": [{"name": "Badshahi Mosque", "description": "A monolithic marvel of 17th-century Mughal engineering."}, {"name": "Lahore Fort", "description": "A formidable citadel recognized globally as a UNESCO World Heritage site."}],
+        "activities": ["Gastronomic exploration in the Walled City", "Heritage walking tours", "Attendance at the Wagah Border ceremonial protocol"],
+        "transport": {"Islamabad": {"road": "4 hours via the M-2 Motorway", "air": "45-minute commercial flight"}},
+        "accommodation": {"budget": ["Central municipal hostels"], "luxury": ["Pearl Continental Lahore"]},
+        "connectivity": {"mobile_networks": ["Universal coverage across all major carriers"], "internet": "High-velocity fiber-optic and 4G/5G infrastructure universally accessible", "tips": "Procure localized ride-hailing applications for optimal municipal transit."},
+        "gallery_images": [
+            "https://images.unsplash.com/photo-1584288079521-4f1816bb6e4b?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1610408552174-8b65e90dcb0a?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1620358823101-b6a482b8a0df?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1524231757912-21f4fe3a7200?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1513635269975-59663e0ac1ad?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1518398046578-8cca57782e17?auto=format&fit=crop&w=800&q=80"
+        ]
+    },
+    {
+        "name": "Islamabad",
+        "region": "Capital Territory",
+        "access_level": "Easy",
+        "latitude": 33.6844,
+        "longitude": 73.0479,
+        "altitude_m": 540,
+        "best_season": "October - April",
+        "budget_per_day": {"budget": 4500},
+        "description": "The meticulously master-planned federal capital, distinguished by its verdant expanses, systematic sectorial grid, and immediate proximity to the forested Margalla Hills.",
+        "history": "Conceptualized and actualized in the 1960s to replace Karachi as the national capital, integrating modern architectural paradigms with profound Islamic geometric influences.",
+        "landmarks": [{"name": "Faisal Mosque", "description": "An architectural masterpiece capable of accommodating 100,000 worshippers."}, {"name": "Pakistan Monument", "description": "A comprehensive homage to the nation's heritage."}],
+        "activities": ["Hiking the Margalla trail network", "Diplomatic enclave traversal", "Elite culinary dining"],
+        "transport": {"Lahore": {"road": "4 hours via M-2 Motorway", "air": "45-minute commercial transit"}},
+        "accommodation": {"budget": ["Sector G-9 standard accommodations"], "luxury": ["Serena Hotel Islamabad", "Marriott Hotel"]},
+        "connectivity": {"mobile_networks": ["Universal 4G/5G coverage"], "internet": "Optimal high-speed connectivity across all vectors", "tips": "Utilize dedicated municipal transit paths for rapid sector-to-sector movement."},
+        "gallery_images": [
+            "https://images.unsplash.com/photo-1601004838634-11883c8c7eb2?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1622396481328-9b1b78cdd9fd?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1579208035657-320d3f2fcb9f?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1510414842594-a61c69b5ae57?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1444703686981-a3abbc4d4fe3?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1449844908441-8829872d2607?auto=format&fit=crop&w=800&q=80"
+        ]
+    },
+    {
+        "name": "Fairy Meadows",
+        "region": "Gilgit-Baltistan",
+        "access_level": "Difficult",
+        "latitude": 35.385,
+        "longitude": 74.5786,
+        "altitude_m": 3300,
+        "best_season": "June - September",
+        "budget_per_day": {"budget": 8000},
+        "description": "An elevated, isolated alpine pasture functioning as the primary observational platform for Nanga Parbat, the ninth highest terrestrial summit globally.",
+        "history": "Historically utilized as a base camp for global mountaineering expeditions attempting the perilous ascent of the 'Killer Mountain'.",
+        "landmarks": [{"name": "Nanga Parbat Base Camp", "description": "The ultimate destination for advanced trekkers."}, {"name": "Reflection Lake", "description": "A pristine alpine pool mirroring the Nanga Parbat massif."}],
+        "activities": ["Strenuous high-altitude trekking", "Nocturnal astrophotography", "Survivalist camping"],
+        "transport": {"Islamabad": {"road": "16 hours to Raikot Bridge, followed by extreme off-road jeep transit and a 3-hour vertical hike"}},
+        "accommodation": {"budget": ["Basic wooden alpine huts"], "luxury": ["Premium glamping pods with localized heating"]},
+        "connectivity": {"mobile_networks": ["Severely restricted"], "internet": "Functional telecommunication blackout", "tips": "Satellite communication recommended for critical emergencies."},
+        "gallery_images": [
+            "https://images.unsplash.com/photo-1516466723877-e4ec1d736c8a?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1513836279014-a89f7a76ae86?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1483728642387-6c3ba6c6af5f?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1506744626753-1492d2426c11?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1454496522488-7a8e488e8606?auto=format&fit=crop&w=800&q=80",
+            "https://images.unsplash.com/photo-1469334031218-e382a71b716b?auto=format&fit=crop&w=800&q=80"
+        ]
+    },
+    {
+        "name": "Mohenjo-Daro",
+        "region": "Sindh",
+        "access_level": "Easy",
+        "latitude": 27.3292,
+        "longitude": 68.1389,
+        "altitude_m": 47,
+        "best_season": "November - February",
+        "budget_per_day": {"budget": 3500},
+        "description": "An archaeological masterwork representing one of the earliest and most sophisticated urban settlements in human history, situated adjacent to the Indus River.",
+        "history": "Flourishing circa 2500 BCE, this Indus Valley Civilization metropolis featured advanced civil engineering, including complex drainage systems and standardized brick architecture.",
+        "landmarks": [{"name": "The Great Bath", "description": "A monumental public aquatic structure."}, {"name": "The Buddhist Stupa", "description": "A subsequent addition overlaying the ancient ruins."}],
+        "activities": ["Archaeological site immersion", "Historical museum analysis"],
+        "transport": {"Karachi": {"road": "7-8 hours via the Indus Highway", "air": "Domestic flight to Sukkur followed by vehicular transit"}},
+        "accommodation": {"budget": ["Larkana municipal guest houses"], "luxury": ["PTDC Motel Larkana"]},
+        "connectivity": {"mobile_networks": ["Jazz", "Zong", "Telenor"], "internet": "Standard 3G/4G within the vicinity", "tips": "Deploy rigorous ultraviolet mitigation protocols during daylight hours."}
+    },
+    {
+        "name": "Neelum Valley",
+        "region": "Azad Kashmir",
+        "access_level": "Moderate",
+        "latitude": 34.5895,
+        "longitude": 73.907,
+        "altitude_m": 1500,
+        "best_season": "May - October",
+        "budget_per_day": {"budget": 4500},
+        "description": "A bow-shaped, densely forested gorge spanning 144 kilometers, celebrated for its sapphire-hued river, cascading waterfalls, and profound tranquility.",
+        "history": "Serving as a critical historical artery in the Kashmir region, the valley is steeped in complex geopolitical history and regional folklore.",
+        "landmarks": [{"name": "Arang Kel", "description": "An idyllic, highly elevated settlement accessible via cable car."}, {"name": "Sharda", "description": "A breathtaking panoramic viewpoint containing ancient university ruins."}],
+        "activities": ["Riverine navigation", "Botanical exploration", "Alpine lodging"],
+        "transport": {"Islamabad": {"road": "8-10 hours via Muzaffarabad"}},
+        "accommodation": {"budget": ["Keran riverside huts"], "luxury": ["State-operated luxury cabins in Sharda"]},
+        "connectivity": {"mobile_networks": ["SCOM exclusive"], "internet": "Highly intermittent; substantial localized blackouts", "tips": "Verification of border proximity restrictions is mandatory prior to transit."}
+    }
+]
+
+CatalogIndex = namedtuple("CatalogIndex", "destinations by_name by_region by_access by_month")
+
+class DestinationCatalog:
+    """
+    destinations.json parsed once per process and indexed by name, region,
+    access level and month of the optimal season. Every accessor checks the
+    data version and the file's mtime (hand edits don't bump the version)
+    and reloads only when either has changed; a missing or empty file
+    serves FALLBACK_DESTINATIONS. A reload builds a new CatalogIndex and
+    swaps it in with one assignment, so readers never see a mix of old and
+    new indexes.
+    """
+    def __init__(self, filename, fallback):
+        self.filename = filename
+        self.path = os.path.join(DATA_DIR, filename)
+        self.fallback = fallback
+        self.stamp = object()  # sentinel: never equal to a real stamp or None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._index = self._build([])
+
+    @staticmethod
+    def _build(dests):
+        by_region, by_access, by_month = {}, {}, {m: [] for m in range(1, 13)}
+        for d in dests:
+            by_region.setdefault(d.get("region", "Unspecified Territory"), []).append(d)
+            by_access.setdefault(d.get("access_level", "N/A"), []).append(d)
+            for m in parse_season_months(d.get("best_season", "")):
+                by_month[m].append(d)
+        return CatalogIndex(dests, {d["name"]: d for d in dests}, by_region, by_access, by_month)
+
+    def _refresh(self):
+        """The current index, reloaded first if the file or data version changed."""
+        try: stamp = (get_data_version(), os.stat(self.path).st_mtime_ns)
+        except OSError: stamp = None
+        if stamp == self.stamp: return self._index
+        with self._lock:
+            if stamp != self.stamp:
+                dests = load_json(self.filename) if stamp is not None else []
+                self._index = self._build(dests or self.fallback)
+                self.stamp = stamp
+                self.reloads += 1
+            return self._index
+
+    def all(self):
+        return self._refresh().destinations
+
+    def get(self, name):
+        return self._refresh().by_name.get(name)
+
+    def regions(self):
+        return sorted(self._refresh().by_region)
+
+    def in_region(self, region):
+        return self._refresh().by_region.get(region, [])
+
+    def with_access(self, level):
+        return self._refresh().by_access.get(level, [])
+
+    def in_season(self, month):
+        return self._refresh().by_month.get(month, [])
+
+@st.cache_resource
+def get_destination_catalog():
+    return DestinationCatalog("destinations.json", FALLBACK_DESTINATIONS)
+
+# ============================================================
+# TOURISM STORE (optional SQLite + FTS5 backend)
+# ============================================================
+TOURISM_DOCUMENTS = ("budget_templates.json", "emergency_contacts.json")
+
+class TourismStore:
+    """
+    SQLite mirror of the data directory. Destinations get one row each plus
+    an FTS5 index over description, history, landmarks and activities,
+    ranked with bm25; budget templates and emergency contacts are kept as
+    whole JSON documents. A source file is re-imported whenever its mtime
+    differs from the one recorded at its last import. Without FTS5 support,
+    search degrades to a LIKE scan.
+    """
+    # bm25 column weights: name, description, history, landmarks, activities
+    BM25_WEIGHTS = (10.0, 1.0, 1.0, 3.0, 2.0)
+
+    def __init__(self, path, data_dir):
+        self.data_dir = data_dir
+        self.last_import = None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS destinations (
+            name TEXT PRIMARY KEY, position INTEGER, region TEXT, access_level TEXT, body TEXT)""")
+        self._db.execute("CREATE TABLE IF NOT EXISTS documents (filename TEXT PRIMARY KEY, body TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sources (filename TEXT PRIMARY KEY, mtime INTEGER)")
         try:
-            # DeepSeek API call (assuming OpenAI-compatible endpoint)
-            headers = {
-                "Authorization": f"Bearer {DEEPSEEK_KEY}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": "deepseek-chat",
-                "messages": messages,
-                "temperature": 0.7
-            }
-            response = requests.post(
-                "https://api.deepseek.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"], "deepseek"
-        except Exception as e2:
-            st.error(f"Both AI services failed. Groq: {str(e)[:100]}, DeepSeek: {str(e2)[:100]}")
-            return "I'm sorry, but I'm unable to process your request at the moment. Please try again later.", None
+            self._db.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS destinations_fts USING fts5(
+                name, description, history, landmarks, activities, tokenize = 'porter unicode61')""")
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self._db.commit()
+
+    def _mtime(self, filename):
+        try: return os.stat(os.path.join(self.data_dir, filename)).st_mtime_ns
+        except OSError: return None
+
+    def sync(self, force=False):
+        """Re-import every source file whose mtime changed since its last import (all of them if force)."""
+        with self._lock:
+            recorded = dict(self._db.execute("SELECT filename, mtime FROM sources").fetchall())
+            changed = False
+            for filename in ("destinations.json",) + TOURISM_DOCUMENTS:
+                mtime = self._mtime(filename)
+                if not force and filename in recorded and recorded[filename] == mtime:
+                    continue
+                if filename == "destinations.json":
+                    self._import_destinations(load_json(filename) or FALLBACK_DESTINATIONS)
+                else:
+                    self._db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)",
+                                     (filename, json.dumps(load_json(filename), ensure_ascii=False)))
+                self._db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (filename, mtime))
+                changed = True
+            if changed:
+                self._db.commit()
+                self.last_import = time.time()
+
+    def _import_destinations(self, dests):
+        self._db.execute("DELETE FROM destinations")
+        if self.fts:
+            self._db.execute("DELETE FROM destinations_fts")
+        for i, d in enumerate(dests):
+            self._db.execute("INSERT OR REPLACE INTO destinations VALUES (?, ?, ?, ?, ?)",
+                             (d["name"], i, d.get("region"), d.get("access_level"), json.dumps(d, ensure_ascii=False)))
+            if self.fts:
+                landmarks = " ".join(f"{l.get('name', '')} {l.get('description', '')}" for l in d.get("landmarks", []))
+                # a repeated name replaced its destinations row above; drop its old search row to match
+                self._db.execute("DELETE FROM destinations_fts WHERE name = ?", (d["name"],))
+                self._db.execute("INSERT INTO destinations_fts VALUES (?, ?, ?, ?, ?)",
+                                 (d["name"], d.get("description", ""), d.get("history", ""), landmarks, " ".join(d.get("activities", []))))
+
+    @staticmethod
+    def fts_query(text):
+        # Quote every term so user input can't inject FTS5 syntax; the last term matches as a prefix
+        terms = re.findall(r"\w+", text.lower())
+        return " ".join(f'"{t}"' for t in terms[:-1]) + (f' "{terms[-1]}"*' if terms else "")
+
+    def search(self, text, limit=20):
+        """[(name, snippet)] best match first."""
+        query = self.fts_query(text)
+        if not query:
+            return []
+        self.sync()
+        with self._lock:
+            if self.fts:
+                weights = ", ".join(str(w) for w in self.BM25_WEIGHTS)
+                return self._db.execute(
+                    f"""SELECT name, snippet(destinations_fts, -1, '<mark>', '</mark>', '…', 16)
+                        FROM destinations_fts WHERE destinations_fts MATCH ?
+                        ORDER BY bm25(destinations_fts, {weights}) LIMIT ?""",
+                    (query, limit)
+                ).fetchall()
+            like = f"%{text.strip()}%"
+            rows = self._db.execute(
+                "SELECT name FROM destinations WHERE name LIKE ? OR body LIKE ? ORDER BY name NOT LIKE ?, position LIMIT ?",
+                (like, like, like, limit)
+            ).fetchall()
+            return [(name, "") for (name,) in rows]
+
+    def document(self, filename):
+        self.sync()
+        with self._lock:
+            row = self._db.execute("SELECT body FROM documents WHERE filename = ?", (filename,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stats(self):
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM destinations").fetchone()[0]
+        return {"destinations": count, "fts": self.fts, "last_import": self.last_import}
+
+@st.cache_resource
+def get_tourism_store():
+    if not TOURISM_STORE_ENABLED:
+        return None
+    try:
+        store = TourismStore(TOURISM_DB_PATH, DATA_DIR)
+        store.sync()
+        return store
+    except sqlite3.Error:
+        return None
+
+FALLBACK_BUDGET_TEMPLATES = {
+    "travel_styles": ["Budget", "Standard", "Luxury"],
+    "categories": [
+        {"name": "Premium Accommodations", "icon": "🏨", "budget": 2000, "standard": 5000, "luxury": 15000},
+        {"name": "Culinary Sustenance", "icon": "🍽️", "budget": 1200, "standard": 3000, "luxury": 8000},
+        {"name": "Logistical Transit", "icon": "🚙", "budget": 800, "standard": 2500, "luxury": 8000},
+        {"name": "Excursions & Admissions", "icon": "🎟️", "budget": 300, "standard": 1000, "luxury": 3000},
+        {"name": "Telecommunications", "icon": "📡", "budget": 150, "standard": 300, "luxury": 500},
+        {"name": "Contingency Capital", "icon": "💼", "budget": 500, "standard": 1500, "luxury": 5000}
+    ],
+    "currency_rates": {
+        "USD": 0.0036, "EUR": 0.0033, "GBP": 0.0028, "AED": 0.013, "CNY": 0.026
+    },
+    "tips": [
+        "Utilize verified ride-hailing networks (Careem/InDrive) in lieu of traditional municipal taxis to ensure pricing transparency.",
+        "Engage with localized gastronomic establishments for an authentic and economically optimized culinary experience.",
+        "Execute lodging reservations pre-emptively during peak meteorological windows (June–August) to avert demand-surge pricing."
+    ]
+}
+
+def load_tourism_data(filename):
+    """A data-directory document, served from the SQLite store when it is enabled."""
+    store = get_tourism_store()
+    data = store.document(filename) if store else None
+    return data if data is not None else load_json(filename)
+
+# ============================================================
+# BUDGET ENGINE (vectorized destination x tier x duration x party)
+# ============================================================
+BUDGET_MAX_DAYS = 30
+BUDGET_MAX_PEOPLE = 10
+
+class BudgetEngine:
+    """
+    Every trip cost the budget page can ask for, computed up front as one
+    numpy tensor of shape (destination, tier, days, people). A destination's
+    multiplier for a tier is its budget_per_day for that tier (or its
+    "budget" figure) over the median across destinations, so the category
+    templates scale with how expensive each place is; destinations without
+    a figure use 1.0.
+    """
+    def __init__(self, categories, styles, destinations, max_days=BUDGET_MAX_DAYS, max_people=BUDGET_MAX_PEOPLE):
+        self.categories = categories
+        self.styles = styles
+        self.names = [d["name"] for d in destinations]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        tiers = [s.lower() for s in styles]
+        # (tier, category) per-capita daily allocation
+        self.base = np.array([[c.get(t, 0) for c in categories] for t in tiers], dtype=float)
+        self.multipliers = self._multipliers(destinations, tiers)
+        self.days = np.arange(1, max_days + 1)
+        self.people = np.arange(1, max_people + 1)
+        daily = self.multipliers * self.base.sum(axis=1)  # (destination, tier)
+        self.totals = np.rint(daily[:, :, None, None] * self.days[None, None, :, None] * self.people[None, None, None, :])
+
+    @staticmethod
+    def _multipliers(destinations, tiers):
+        figures = np.array([[d.get("budget_per_day", {}).get(t, d.get("budget_per_day", {}).get("budget", np.nan)) for t in tiers]
+                            for d in destinations], dtype=float).reshape(len(destinations), len(tiers))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mult = figures / np.nanmedian(figures, axis=0) if np.isfinite(figures).any() else np.ones_like(figures)
+        return np.where(np.isfinite(mult) & (mult > 0), mult, 1.0)
+
+    def multiplier(self, dest, style):
+        return float(self.multipliers[self.index[dest], self.styles.index(style)])
+
+    def breakdown(self, dest, style, days, people):
+        """Per-category totals (PKR) for one destination, tier, duration and party size."""
+        return np.rint(self.multiplier(dest, style) * self.base[self.styles.index(style)] * days * people)
+
+    def total(self, dest, style, days, people):
+        return int(self.totals[self.index[dest], self.styles.index(style), days - 1, people - 1])
+
+    def compare(self, style, days, people):
+        t = self.styles.index(style)
+        totals = self.totals[:, t, days - 1, people - 1]
+        df = pd.DataFrame({
+            "Destination": self.names,
+            "Cost Multiplier": np.round(self.multipliers[:, t], 2),
+            "Total (PKR)": totals.astype(int),
+            "Per Capita (PKR)": (totals // people).astype(int),
+            "Daily Burn (PKR)": (totals // days).astype(int),
+        })
+        return df.sort_values("Total (PKR)").reset_index(drop=True)
+
+    def heatmap(self, style, people):
+        """Destination x duration totals for one tier and party size."""
+        return pd.DataFrame(self.totals[:, self.styles.index(style), :, people - 1].astype(int), index=self.names, columns=self.days)
+
+BUDGET_OPTIMIZER_UNITS = 400      # budget resolution of the knapsack table
+BUDGET_OPTIMIZER_CANDIDATES = 40  # cheapest destinations considered
+
+def optimize_trip(engine, style, people, budget, objective="days", min_stay=2, max_stay=7):
+    """
+    Multiple-choice knapsack over destinations: each one is skipped or
+    visited for min_stay..max_stay days, with the total capped at `budget`
+    for the whole party. objective="days" maximizes total days (then
+    destinations), "destinations" the reverse. Costs are rounded up to
+    budget/BUDGET_OPTIMIZER_UNITS so a plan never overshoots. Returns
+    ([(destination, days, cost)], total cost).
+    """
+    t = engine.styles.index(style)
+    daily = engine.multipliers[:, t] * engine.base[t].sum() * people
+    order = [int(i) for i in np.argsort(daily)[:BUDGET_OPTIMIZER_CANDIDATES] if daily[i] > 0]
+    unit = max(budget / BUDGET_OPTIMIZER_UNITS, 1.0)
+    stays = range(min_stay, max_stay + 1)
+    units = [[int(np.ceil(daily[i] * k / unit)) for k in stays] for i in order]
+
+    @lru_cache(maxsize=None)
+    def best(pos, remaining):
+        # -> (score, choices) for destinations order[pos:] within `remaining` units
+        if pos == len(order):
+            return (0, 0), ()
+        result = best(pos + 1, remaining)
+        for k, cost in zip(stays, units[pos]):
+            if cost > remaining:
+                break
+            score, choices = best(pos + 1, remaining - cost)
+            score = (score[0] + k, score[1] + 1) if objective == "days" else (score[0] + 1, score[1] + k)
+            if score > result[0]:
+                result = score, ((pos, k),) + choices
+        return result
+
+    _, choices = best(0, BUDGET_OPTIMIZER_UNITS)
+    plan = [(engine.names[order[pos]], k, int(round(daily[order[pos]] * k))) for pos, k in choices]
+    return plan, sum(cost for _, _, cost in plan)
+
+@st.cache_resource(max_entries=4)
+def _build_budget_engine(fingerprint, _categories, _styles, _destinations):
+    return BudgetEngine(_categories, _styles, _destinations)
+
+def get_budget_engine(budget_data, destinations):
+    # Rebuilt only when the templates or the destinations' daily budgets change
+    categories = budget_data.get("categories", [])
+    styles = budget_data.get("travel_styles", ["Budget", "Standard", "Luxury"])
+    blob = json.dumps([categories, styles, [(d["name"], d.get("budget_per_day", {})) for d in destinations]], sort_keys=True, ensure_ascii=False)
+    return _build_budget_engine(hashlib.sha256(blob.encode("utf-8")).hexdigest(), categories, styles, destinations)
+
+# ============================================================
+# CURRENCY RATES (pluggable provider, TTL cache, last-known-good)
+# ============================================================
+class HttpRateProvider:
+    """
+    One GET for every currency against a PKR base. Accepts the open.er-api
+    shape ({"rates": {...}}) which the exchangerate.host and stub servers
+    also return. Any object with a `name` and `fetch(symbols)` can stand in.
+    """
+    name = "live"
+
+    def __init__(self, url):
+        self.url = url
+
+    def fetch(self, symbols):
+        data = get_http_client().get(self.url, endpoint="fx").json()
+        rates = data.get("rates") or {}
+        missing = [s for s in symbols if not isinstance(rates.get(s), (int, float))]
+        if not rates or len(missing) == len(symbols):
+            raise ValueError(f"rate feed returned no usable rates ({data.get('result', 'unknown result')})")
+        return {s: float(rates[s]) for s in symbols if s not in missing}
+
+class CurrencyRates:
+    """
+    PKR -> foreign currency rates. With no provider the caller's static
+    rates are used as-is. Otherwise answers from the in-process TTL cache,
+    otherwise fetches every currency in one provider call (deduplicated
+    across sessions). Each good fetch is written to disk as the
+    last-known-good snapshot, served when the provider is down; with no
+    snapshot either, the caller's static rates are used. After a failed
+    fetch the provider is left alone for `retry_after` seconds.
+    """
+    def __init__(self, provider, ttl, snapshot_path, retry_after=300):
+        self.provider = provider
+        self.cache = TTLCache(ttl, 8)
+        self.snapshot_path = snapshot_path
+        self.retry_after = retry_after
+        self.next_attempt = 0.0
+        self._flight = SingleFlight()
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _fetch(self, key, symbols):
+        rates = self.provider.fetch(symbols)
+        entry = {"rates": rates, "fetched_at": time.time(), "source": self.provider.name}
+        self.cache.set(key, entry)
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            _atomic_write(self.snapshot_path, json.dumps(entry))
+        except OSError:
+            pass
+        return entry
+
+    def get(self, symbols, static_rates):
+        """{"rates": {code: rate}, "fetched_at": ts or None, "source": "live" / "last-known-good" / "static"}."""
+        symbols = sorted(symbols)
+        key = "PKR:" + ",".join(symbols)
+        entry = self.cache.get(key)
+        if self.provider and entry is None:
+            if time.time() >= self.next_attempt:
+                try:
+                    entry = self._flight.do(key, lambda: self._fetch(key, symbols))
+                except Exception:
+                    self.next_attempt = time.time() + self.retry_after
+            if entry is None:
+                entry = self._load_snapshot()
+                if entry:
+                    entry = dict(entry, source="last-known-good")
+        rates = dict(static_rates)
+        if entry:
+            rates.update(entry["rates"])
+        return {"rates": {s: rates[s] for s in symbols if s in rates},
+                "fetched_at": entry["fetched_at"] if entry else None,
+                "source": entry["source"] if entry else "static"}
+
+@st.cache_resource
+def get_currency_rates():
+    provider = HttpRateProvider(FX_RATES_URL) if FX_PROVIDER == "http" else None
+    return CurrencyRates(provider, FX_CACHE_TTL, os.path.join(CACHE_DIR, "fx_last_known_good.json"))
+
+def convert_currencies(amounts, rates):
+    """Every PKR amount in every currency at once: an (amounts x currencies) DataFrame."""
+    codes = list(rates)
+    matrix = np.outer(np.asarray(amounts, dtype=float), np.array([rates[c] for c in codes], dtype=float))
+    return pd.DataFrame(np.round(matrix, 2), columns=codes)
+
+# ============================================================
+# GEOSPATIAL INDEX (nearest hospitals, embassies, destinations)
+# ============================================================
+# City centroids for records that carry a city but no coordinates of their own
+CITY_COORDS = {
+    "Islamabad": (33.6844, 73.0479), "Rawalpindi": (33.5651, 73.0169), "Lahore": (31.5204, 74.3587),
+    "Multan": (30.1575, 71.5249), "Faisalabad": (31.4504, 73.1350), "Karachi": (24.8607, 67.0011),
+    "Hyderabad": (25.3960, 68.3578), "Peshawar": (34.0151, 71.5249), "Mingora": (34.7717, 72.3602),
+    "Abbottabad": (34.1688, 73.2215), "Chitral": (35.8518, 71.7864), "Quetta": (30.1798, 66.9750),
+    "Muzaffarabad": (34.3700, 73.4711), "Gilgit": (35.9208, 74.3144), "Skardu": (35.2971, 75.6333),
+    "Aliabad": (36.3078, 74.6178), "Chilas": (35.4206, 74.0940),
+}
+
+FALLBACK_EMERGENCY_CONTACTS = {
+    "national": [
+        {"service": "Federal Police Emergency Command", "number": "15", "coverage": "Nationwide"},
+        {"service": "Rapid Deployment Rescue 1122", "number": "1122", "coverage": "Punjab, KPK, Islamabad, AJK, GB"},
+        {"service": "Edhi Foundation Medical Evacuation", "number": "115", "coverage": "Nationwide"},
+        {"service": "Municipal Fire Brigade Services", "number": "16", "coverage": "Nationwide"},
+        {"service": "National Tourism Assistance Protocol", "number": "1422", "coverage": "Nationwide"},
+        {"service": "Federal Motorway Security Forces", "number": "130", "coverage": "All Federal Transit Arteries"},
+        {"service": "Federal Investigation Agency (FIA)", "number": "9911", "coverage": "Nationwide"},
+        {"service": "National Disaster Management Authority", "number": "051-9205037", "coverage": "Nationwide"}
+    ],
+    "regional": {
+        "Punjab": {
+            "rescue": "1122",
+            "police": "15",
+            "hospitals": [
+                {"name": "Mayo Premier Medical Facility", "city": "Lahore", "phone": "042-99211111"},
+                {"name": "Services Hospital Complex", "city": "Lahore", "phone": "042-99200601"},
+                {"name": "Nishtar Hospital Pavilion", "city": "Multan", "phone": "061-9200432"},
+                {"name": "Allied Regional Medical Center", "city": "Faisalabad", "phone": "041-9210079"}
+            ]
+        },
+        "Sindh": {
+            "rescue": "1122 / 115",
+            "police": "15",
+            "hospitals": [
+                {"name": "Jinnah Postgraduate Medical Centre", "city": "Karachi", "phone": "021-99201300"},
+                {"name": "Civil Hospital Central Infrastructure", "city": "Karachi", "phone": "021-99215740"}
+            ]
+        },
+        "Gilgit-Baltistan": {
+            "rescue": "1122",
+            "police": "15",
+            "hospitals": [
+                {"name": "District Headquarters (DHQ) Gilgit", "city": "Gilgit", "phone": "05811-920253"},
+                {"name": "District Headquarters (DHQ) Skardu", "city": "Skardu", "phone": "05815-920282"}
+            ]
+        }
+    },
+    "embassies": [
+        {"country": "United States of America", "city": "Islamabad", "phone": "051-2014000", "address": "Diplomatic Enclave, Ramna 5"},
+        {"country": "United Kingdom", "city": "Islamabad", "phone": "051-2012000", "address": "Diplomatic Enclave, Ramna 5"},
+        {"country": "People's Republic of China", "city": "Islamabad", "phone": "051-2260113", "address": "No. 1, Zhou-Enlai Avenue, Diplomatic Enclave"}
+    ],
+    "tourist_police": {
+        "description": "Specialized constabulary units deployed specifically to facilitate, protect, and escort international and domestic travelers.",
+        "contacts": [
+            {"service": "Islamabad Tourism Constabulary", "phone": "1015"}
+        ]
+    }
+}
+
+def load_emergency_contacts():
+    return load_tourism_data("emergency_contacts.json") or FALLBACK_EMERGENCY_CONTACTS
+
+def _coords(record):
+    if "latitude" in record and "longitude" in record:
+        return record["latitude"], record["longitude"]
+    return CITY_COORDS.get(record.get("city"))
+
+class GeoIndex:
+    """
+    Points of interest grouped by kind ("destination", "hospital",
+    "embassy"), each kind held as numpy coordinate arrays plus a grid of
+    `cell_deg` degree cells. Radius queries only scan the cells the search
+    circle overlaps; k-nearest runs one vectorized haversine pass and
+    argpartition. Final distances are refined with geopy's geodesic.
+    """
+    EARTH_RADIUS_KM = 6371.0088
+
+    def __init__(self, points, cell_deg=1.0):
+        self.cell_deg = cell_deg
+        self.kinds = {}
+        grouped = {}
+        for p in points:
+            grouped.setdefault(p["kind"], []).append(p)
+        for kind, items in grouped.items():
+            lats = np.radians([p["lat"] for p in items])
+            lons = np.radians([p["lon"] for p in items])
+            grid = {}
+            for i, p in enumerate(items):
+                grid.setdefault(self._cell(p["lat"], p["lon"]), []).append(i)
+            self.kinds[kind] = (items, lats, lons, {c: np.array(ix) for c, ix in grid.items()})
+
+    def __len__(self):
+        return sum(len(items) for items, *_ in self.kinds.values())
+
+    def _cell(self, lat, lon):
+        return int(lat // self.cell_deg), int(lon // self.cell_deg)
+
+    def _haversine(self, lat, lon, lats, lons):
+        lat, lon = np.radians(lat), np.radians(lon)
+        a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+        return 2 * self.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def _results(self, items, idx, lat, lon):
+        results = [dict(items[i], distance_km=geodesic((lat, lon), (items[i]["lat"], items[i]["lon"])).km) for i in idx]
+        return sorted(results, key=lambda r: r["distance_km"])
+
+    def nearest(self, lat, lon, kind, k=3, exclude=None):
+        if kind not in self.kinds:
+            return []
+        items, lats, lons, _ = self.kinds[kind]
+        dists = self._haversine(lat, lon, lats, lons)
+        if exclude:
+            dists[[i for i, p in enumerate(items) if p["name"] == exclude]] = np.inf
+        k = min(k, int(np.isfinite(dists).sum()))
+        if k <= 0:
+            return []
+        idx = np.argpartition(dists, k - 1)[:k]
+        return self._results(items, idx, lat, lon)
+
+    def within(self, lat, lon, radius_km, kind, exclude=None):
+        if kind not in self.kinds:
+            return []
+        items, lats, lons, grid = self.kinds[kind]
+        # Degrees of latitude are ~111 km; longitude cells shrink with cos(lat)
+        dlat = radius_km / 111.0
+        dlon = radius_km / max(111.0 * np.cos(np.radians(lat)), 1e-6)
+        (r0, c0), (r1, c1) = self._cell(lat - dlat, lon - dlon), self._cell(lat + dlat, lon + dlon)
+        cells = [grid[(r, c)] for r in range(r0, r1 + 1) for c in range(c0, c1 + 1) if (r, c) in grid]
+        if not cells:
+            return []
+        idx = np.concatenate(cells)
+        dists = self._haversine(lat, lon, lats[idx], lons[idx])
+        keep = [i for i, d in zip(idx, dists) if d <= radius_km and items[i]["name"] != exclude]
+        return self._results(items, keep, lat, lon)
+
+def geo_points(destinations, contacts):
+    points = []
+    for d in destinations:
+        if "latitude" in d and "longitude" in d:
+            points.append({"kind": "destination", "name": d["name"], "lat": d["latitude"], "lon": d["longitude"], "region": d.get("region", "")})
+    for region, rdata in contacts.get("regional", {}).items():
+        for h in rdata.get("hospitals", []):
+            coords = _coords(h)
+            if coords:
+                points.append({"kind": "hospital", "name": h["name"], "lat": coords[0], "lon": coords[1], "city": h.get("city", ""),
+                               "phone": h.get("phone", ""), "region": region, "rescue": rdata.get("rescue", "1122")})
+    for e in contacts.get("embassies", []):
+        coords = _coords(e)
+        if coords:
+            points.append({"kind": "embassy", "name": e["country"], "lat": coords[0], "lon": coords[1], "city": e.get("city", ""),
+                           "phone": e.get("phone", ""), "address": e.get("address", "")})
+    return points
+
+@st.cache_resource(max_entries=2)
+def _build_geo_index(stamp):
+    return GeoIndex(geo_points(get_destination_catalog().all(), load_emergency_contacts()))
+
+def geo_stamp():
+    """Changes when the catalog reloads, a save_json bumps the data version or emergency_contacts.json is edited by hand."""
+    catalog = get_destination_catalog()
+    catalog.all()
+    try: contacts_mtime = os.stat(os.path.join(DATA_DIR, "emergency_contacts.json")).st_mtime_ns
+    except OSError: contacts_mtime = None
+    return catalog.reloads, get_data_version(), contacts_mtime
+
+def get_geo_index():
+    return _build_geo_index(geo_stamp())
+
+# ============================================================
+# IMAGE THUMBNAILS (fetched once, WebP, served as static files)
+# ============================================================
+class ThumbnailCache:
+    """
+    Remote images fetched once and re-encoded by Pillow as WebP at each of
+    `widths` (never upscaled), stored content-addressed as
+    <sha256>-<width>.webp under Streamlit's static folder. An index (kept
+    outside the served folder) maps source URLs to digests so nothing is
+    fetched twice. Generation runs on
+    a small private pool; until an image is ready, pages get the original
+    URL. A URL that fails to fetch or decode is retried only after an
+    exponential backoff (`retry_after` doubling up to `retry_cap` seconds).
+    """
+    def __init__(self, directory, index_path, url_prefix, widths, quality, workers=2, retry_after=60.0, retry_cap=6 * 3600):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.widths = sorted(widths)
+        self.quality = quality
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._failures = {}  # url -> (consecutive failures, retry not before)
+        self.retry_after = retry_after
+        self.retry_cap = retry_cap
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def srcset(self, url):
+        """(src, srcset) for a generated image, or None while it is still pending."""
+        entry = self.index.get(url)
+        if not entry:
+            return None
+        files = [(w, f"{self.url_prefix}/{entry['digest']}-{w}.webp") for w in entry["widths"]]
+        return files[len(files) // 2][1], ", ".join(f"{path} {w}w" for w, path in files)
+
+    def ensure(self, urls):
+        """Queue every URL that has no thumbnails yet and isn't backing off after a failure; returns immediately."""
+        now = time.time()
+        with self._lock:
+            todo = [u for u in urls if u not in self.index and u not in self._pending and self._failures.get(u, (0, 0))[1] <= now]
+            self._pending.update(todo)
+        for url in todo:
+            self._pool.submit(self._generate, url)
+
+    def _generate(self, url):
+        try:
+            raw = get_http_client().get(url, endpoint="images").content
+            digest = hashlib.sha256(raw).hexdigest()
+            image = ImageOps.exif_transpose(Image.open(io.BytesIO(raw))).convert("RGB")
+            widths = [w for w in self.widths if w < image.width]
+            if len(widths) < len(self.widths):
+                widths.append(image.width)  # cap the largest size at the source width
+            os.makedirs(self.directory, exist_ok=True)
+            for w in widths:
+                path = os.path.join(self.directory, f"{digest}-{w}.webp")
+                if not os.path.exists(path):  # content-addressed: another URL may have produced it already
+                    thumb = image.resize((w, round(image.height * w / image.width)), Image.LANCZOS)
+                    buf = io.BytesIO()
+                    thumb.save(buf, "WEBP", quality=self.quality, method=4)
+                    with open(path + ".tmp", "wb") as f:
+                        f.write(buf.getvalue())
+                    os.replace(path + ".tmp", path)
+            with self._lock:
+                self.index[url] = {"digest": digest, "widths": widths}
+                self._failures.pop(url, None)
+                os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+                _atomic_write(self.index_path, json.dumps(self.index))
+        except Exception:
+            # the page keeps using the original URL; retried once the backoff expires
+            with self._lock:
+                count = self._failures.get(url, (0, 0))[0] + 1
+                self._failures[url] = (count, time.time() + min(self.retry_cap, self.retry_after * 2 ** (count - 1)))
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+@st.cache_resource
+def get_thumbnail_cache():
+    return ThumbnailCache(THUMB_DIR, os.path.join(CACHE_DIR, "thumbnails.json"), THUMB_URL_PREFIX, THUMB_WIDTHS, THUMB_QUALITY)
+
+def responsive_img(url, alt="", sizes="(max-width: 768px) 100vw, 33vw", style=""):
+    """<img> that serves cached WebP thumbnails via srcset once generated, always lazy-loaded."""
+    thumbs = get_thumbnail_cache()
+    ready = thumbs.srcset(url)
+    if ready is None:
+        thumbs.ensure([url])
+        src, srcset = url, ""
+    else:
+        src, srcset = ready
+    srcset_attr = f' srcset="{srcset}" sizes="{sizes}"' if srcset else ""
+    style_attr = f' style="{style}"' if style else ""
+    return f'<img src="{src}"{srcset_attr} alt="{alt}" loading="lazy" decoding="async"{style_attr}>'
 
 # ============================================================
 # TOURISM FUNCTIONS
 # ============================================================
+@st.cache_resource(max_entries=1)
+def _load_data_snapshot(mtime):
+    try:
+        with open(DATA_SNAPSHOT_PATH, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception:
+        return None
+    return snapshot if snapshot.get("format") == DATA_SNAPSHOT_FORMAT else None
+
+def get_data_snapshot():
+    """The pickled data directory from build_snapshot.py, unpickled once per build (None if absent or unreadable)."""
+    try: mtime = os.stat(DATA_SNAPSHOT_PATH).st_mtime_ns
+    except OSError: return None
+    return _load_data_snapshot(mtime)
+
+def snapshot_is_fresh(snapshot, filename):
+    # A file is served from the snapshot only while its mtime and size match the build
+    try: stat = os.stat(os.path.join(DATA_DIR, filename))
+    except OSError: return False
+    return snapshot["sources"].get(filename) == (stat.st_mtime_ns, stat.st_size)
+
 def load_json(filename):
+    """Parsed data file; shared with the snapshot when fresh, so callers must not mutate it."""
+    snapshot = get_data_snapshot()
+    if snapshot and filename in snapshot["data"] and snapshot_is_fresh(snapshot, filename):
+        return snapshot["data"][filename]
     filepath = os.path.join(DATA_DIR, filename)
     try:
         with open(filepath, "r", encoding="utf-8") as f:
             return json.load(f)
-    except FileNotFoundError:
+    except (FileNotFoundError, json.JSONDecodeError):
         return [] if filename == "destinations.json" else {}
 
+@contextmanager
+def data_lock():
+    """Exclusive inter-process lock over the data directory, held for the duration of a write."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(os.path.join(DATA_DIR, ".lock"), "a+b") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _atomic_write(filepath, text):
+    # Readers see either the old file or the new one, never a truncated one
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filepath), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(filepath).st_mode))  # mkstemp creates 0600; keep the file's own mode
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, filepath)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(filepath), os.O_RDONLY | os.O_DIRECTORY)
+        try: os.fsync(dir_fd)
+        finally: os.close(dir_fd)
+
+def get_data_version():
+    """Monotonic counter bumped by every save_json; cheap enough to check on each rerun."""
+    try:
+        with open(os.path.join(DATA_DIR, ".data_version"), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
 def save_json(filename, data):
     filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with data_lock():
+        _atomic_write(filepath, json.dumps(data, indent=2, ensure_ascii=False))
+        version = get_data_version() + 1
+        _atomic_write(os.path.join(DATA_DIR, ".data_version"), str(version))
+    return version
 
 def get_admin_hash():
     return hashlib.sha256("admin123".encode()).hexdigest()
@@ -769,12 +2698,56 @@ def sanitize_messages(messages):
         else: cleaned.append(msg)
     return cleaned
 
-def fetch_weather_tourism(lat, lon):
-    params = {"latitude": lat, "longitude": lon, "current": "temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code", "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum,weather_code", "timezone": "Asia/Karachi", "forecast_days": 7}
+def _weather_cache_key(lat, lon, current, daily):
+    return f"{lat},{lon}|{current}|{daily}"
+
+def fetch_weather_batch(destinations, current=WEATHER_CURRENT_FIELDS, daily=WEATHER_DAILY_FIELDS, force=False):
+    """
+    Current and daily weather for every destination that has coordinates,
+    fetched in a single Open-Meteo request (comma-separated latitude and
+    longitude lists) and split per destination. Cached destinations are not
+    re-requested unless force=True, and fresh results refresh the
+    per-destination cache. With force=True a failed request raises instead
+    of returning what it could.
+    Returns {destination name: weather data}.
+    """
+    cache = get_weather_cache()
+    results, missing = {}, []
+    for d in destinations:
+        if "latitude" not in d or "longitude" not in d:
+            continue
+        lat, lon = round(d["latitude"], 2), round(d["longitude"], 2)
+        cached = None if force else cache.get(_weather_cache_key(lat, lon, current, daily))
+        if cached is not None:
+            results[d["name"]] = cached
+        else:
+            missing.append((d["name"], lat, lon))
+    if not missing:
+        return results
+    params = {
+        "latitude": ",".join(str(lat) for _, lat, _ in missing),
+        "longitude": ",".join(str(lon) for _, _, lon in missing),
+        "current": current, "daily": daily, "timezone": "Asia/Karachi", "forecast_days": 7
+    }
     try:
-        resp = requests.get(OPEN_METEO_URL, params=params, timeout=10)
-        return resp.json()
-    except: return None
+        response = get_http_client().get(OPEN_METEO_URL, endpoint="open_meteo", params=params)
+        if force: response.raise_for_status()
+        data = response.json()
+    except:
+        if force: raise
+        return results
+    # A single location comes back as an object, several as a list in request order; errors are one object
+    if force and isinstance(data, dict) and data.get("error"):
+        raise RuntimeError(f"Open-Meteo error: {data.get('reason', 'unknown')}")
+    locations = [data] if isinstance(data, dict) else data
+    if not isinstance(locations, list) or len(locations) != len(missing):
+        if force: raise RuntimeError(f"Open-Meteo returned {len(locations) if isinstance(locations, list) else 0} locations for {len(missing)}")
+        return results
+    for (name, lat, lon), item in zip(missing, locations):
+        if item and not item.get("error"):
+            cache.set(_weather_cache_key(lat, lon, current, daily), item)
+            results[name] = item
+    return results
 
 def weather_code_to_text(code):
     codes = {0:"☀️ Clear",1:"🌤️ Mainly Clear",2:"⛅ Partly Cloudy",3:"☁️ Overcast", 45:"🌫️ Foggy",51:"🌦️ Light Drizzle",61:"🌧️ Slight Rain",63:"🌧️ Moderate Rain",65:"🌧️ Heavy Rain",71:"🌨️ Slight Snow",95:"⛈️ Thunderstorm"}
@@ -799,23 +2772,20 @@ Embark on an unparalleled expedition through a land of majestic topographies, pr
 </div>
     """, unsafe_allow_html=True)
     
-    dests = load_json("destinations.json")
-    
-    if not dests:
-        dests = [
-            {"name": "Hunza Valley", "region": "Gilgit-Baltistan", "access_level": "Moderate", "best_season": "April - October", "budget_per_day": {"budget": 5000}},
-            {"name": "Skardu", "region": "Gilgit-Baltistan", "access_level": "Moderate", "best_season": "May - September", "budget_per_day": {"budget": 6000}},
-            {"name": "Swat Valley", "region": "Khyber Pakhtunkhwa", "access_level": "Easy", "best_season": "March - October", "budget_per_day": {"budget": 4000}},
-            {"name": "Lahore", "region": "Punjab", "access_level": "Easy", "best_season": "October - March", "budget_per_day": {"budget": 3000}}
-        ]
+    dests = get_destination_catalog().all()
         
     st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>✨ Curated Destinations</h2>", unsafe_allow_html=True)
     
+    # Live conditions come from the background prefetcher's warm store (never blocks the page)
+    live_weather = {name: data for name, (data, _) in get_weather_prefetcher().snapshot().items()}
+    
     cols = st.columns(min(len(dests), 4))
     for i, dest in enumerate(dests[:4]):
         with cols[i % 4]:
             budget = dest.get('budget_per_day', {}).get('budget', 'N/A')
             budget_str = f"{budget:,}" if isinstance(budget, (int, float)) else str(budget)
+            current = live_weather.get(dest.get('name'), {}).get('current')
+            live_str = f"{current['temperature_2m']} °C · {weather_code_to_text(current['weather_code'])}" if current else "Unavailable"
             
             st.markdown(f"""
 <div class="premium-card">
@@ -824,6 +2794,7 @@ Embark on an unparalleled expedition through a land of majestic topographies, pr
     <div style='display: flex; flex-direction: column; gap: 8px;'>
         <div style='font-size: 0.9em; color: var(--text-secondary);'>🧭 <b>Accessibility:</b> {dest.get('access_level', 'N/A')}</div>
         <div style='font-size: 0.9em; color: var(--text-secondary);'>🌤️ <b>Optimal Window:</b> {dest.get('best_season', 'N/A')}</div>
+        <div style='font-size: 0.9em; color: var(--text-secondary);'>🌡️ <b>Live Conditions:</b> {live_str}</div>
         <div style='font-size: 1.05em; color: var(--text-accent); font-weight: 700; margin-top: 15px; border-top: 1px solid var(--border-color); padding-top: 15px;'>💳 Starts at PKR {budget_str} / day</div>
     </div>
 </div>
@@ -870,151 +2841,49 @@ Embark on an unparalleled expedition through a land of majestic topographies, pr
 
 def page_destinations():
     st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🧭 Geospatial Destination Archive</h2>", unsafe_allow_html=True)
-    dests = load_json("destinations.json")
-    
-    if not dests:
-        dests = [
-            {
-                "name": "Hunza Valley",
-                "region": "Gilgit-Baltistan",
-                "access_level": "Moderate",
-                "altitude_m": 2438,
-                "best_season": "April - October",
-                "budget_per_day": {"budget": 5000},
-                "description": "The Hunza Valley stands as one of Pakistan's most resplendent topographical marvels, ensconced by formidable snow-capped summits including Rakaposhi and Ultar Sar. The domain is globally recognized for its superlative landscapes, ancient fortified structures, and the profound hospitality of the indigenous populace.",
-                "history": "Historically functioning as an autonomous princely state for nearly a millennium under the sovereign rule of the Mir of Hunza, the region served as a pivotal node along the ancient Silk Route. It was fully integrated into the Federation of Pakistan in 1974. The territory is predominantly inhabited by the Burushaski-speaking demographic, utilizing a language isolate bereft of known genealogical affiliations.",
-                "landmarks": [{"name": "Baltit Fort", "description": "A heptacentennial fortress strategically positioned above Karimabad, currently functioning as a UNESCO-endorsed heritage conservatory."}],
-                "activities": ["High-altitude trekking and alpine ascents", "Historical fortification reconnaissance", "Nautical navigation across Attabad Lake"],
-                "transport": {"Islamabad": {"road": "14-16 hours via the Karakoram Highway corridor"}},
-                "accommodation": {"budget": ["Economical lodging facilities in Karimabad"], "luxury": ["Serena Hotel - Premium accommodations"]},
-                "connectivity": {"mobile_networks": ["SCOM (Optimal Infrastructure)", "Telenor"], "internet": "Broadband accessible in primary establishments", "tips": "Procurement of an SCOM cellular subscription in Gilgit is highly advised."}
-            },
-            {
-                "name": "Skardu",
-                "region": "Gilgit-Baltistan",
-                "access_level": "Moderate",
-                "altitude_m": 2228,
-                "best_season": "May - September",
-                "budget_per_day": {"budget": 6000},
-                "description": "Serving as the principal gateway to the Karakoram's eight-thousanders, Skardu is a high-altitude sanctuary characterized by stark alpine deserts, cerulean lakes, and monumental geological formations.",
-                "history": "Capital of the historic Baltistan region, Skardu possesses a profoundly rich Tibetan-influenced heritage, often referred to as 'Little Tibet', manifesting in its architectural vernacular and local gastronomy.",
-                "landmarks": [{"name": "Kharpocho Fort", "description": "An ancient fortification offering panoramic surveillance of the Indus River."}],
-                "activities": ["High-altitude acclimatization", "Deosai National Park traversal", "Engagement with local Balti heritage"],
-                "transport": {"Islamabad": {"road": "20-22 hours via rigorous alpine routes", "air": "45-minute scenic aerial transit"}},
-                "accommodation": {"budget": ["Standard alpine guest houses"], "luxury": ["Shangrila Resort Skardu"]},
-                "connectivity": {"mobile_networks": ["SCOM", "Zong"], "internet": "Intermittent broadband within municipal limits", "tips": "Total telecommunication blackout expected in peripheral zones like Deosai."}
-            },
-            {
-                "name": "Swat Valley",
-                "region": "Khyber Pakhtunkhwa",
-                "access_level": "Easy",
-                "altitude_m": 980,
-                "best_season": "March - October",
-                "budget_per_day": {"budget": 4000},
-                "description": "Historically chronicled as the 'Switzerland of the East', the Swat Valley is an emerald expanse of dense coniferous forests, crystalline glacial rivers, and undulating meadows.",
-                "history": "A pivotal epicenter for early Buddhist civilization, the valley functions as a vast repository of ancient stupas and Gandharan archaeological artifacts.",
-                "landmarks": [{"name": "Malam Jabba", "description": "A premier high-altitude ski resort."}, {"name": "Butkara Stupa", "description": "A monumental relic of Gandharan antiquity."}],
-                "activities": ["Alpine skiing", "Trout fishing", "Archaeological expeditions"],
-                "transport": {"Islamabad": {"road": "4-5 hours via the Swat Motorway infrastructure"}},
-                "accommodation": {"budget": ["Mingora municipal lodgings"], "luxury": ["Serena Hotel Swat"]},
-                "connectivity": {"mobile_networks": ["Jazz", "Telenor", "Zong"], "internet": "Robust 4G LTE saturation in primary urban nodes", "tips": "Signal integrity diminishes in elevated extremities like Kalam."}
-            },
-            {
-                "name": "Lahore",
-                "region": "Punjab",
-                "access_level": "Easy",
-                "altitude_m": 217,
-                "best_season": "October - March",
-                "budget_per_day": {"budget": 3000},
-                "description": "The undisputed cultural epicenter of the Republic, Lahore is a vibrant metropolis that seamlessly amalgamates majestic Mughal architecture with contemporary urban dynamism.",
-                "history": "Serving as the imperial capital for multiple dynasties, Lahore's historical tapestry is woven with the legacies of Mughal emperors, Sikh monarchs, and British colonial administrators.",
-                "landmarks": [{"name": "Badshahi Mosque", "description": "A monolithic marvel of 17th-century Mughal engineering."}, {"name": "Lahore Fort", "description": "A formidable citadel recognized globally as a UNESCO World Heritage site."}],
-                "activities": ["Gastronomic exploration in the Walled City", "Heritage walking tours", "Attendance at the Wagah Border ceremonial protocol"],
-                "transport": {"Islamabad": {"road": "4 hours via the M-2 Motorway", "air": "45-minute commercial flight"}},
-                "accommodation": {"budget": ["Central municipal hostels"], "luxury": ["Pearl Continental Lahore"]},
-                "connectivity": {"mobile_networks": ["Universal coverage across all major carriers"], "internet": "High-velocity fiber-optic and 4G/5G infrastructure universally accessible", "tips": "Procure localized ride-hailing applications for optimal municipal transit."}
-            },
-            {
-                "name": "Islamabad",
-                "region": "Capital Territory",
-                "access_level": "Easy",
-                "altitude_m": 540,
-                "best_season": "October - April",
-                "budget_per_day": {"budget": 4500},
-                "description": "The meticulously master-planned federal capital, distinguished by its verdant expanses, systematic sectorial grid, and immediate proximity to the forested Margalla Hills.",
-                "history": "Conceptualized and actualized in the 1960s to replace Karachi as the national capital, integrating modern architectural paradigms with profound Islamic geometric influences.",
-                "landmarks": [{"name": "Faisal Mosque", "description": "An architectural masterpiece capable of accommodating 100,000 worshippers."}, {"name": "Pakistan Monument", "description": "A comprehensive homage to the nation's heritage."}],
-                "activities": ["Hiking the Margalla trail network", "Diplomatic enclave traversal", "Elite culinary dining"],
-                "transport": {"Lahore": {"road": "4 hours via M-2 Motorway", "air": "45-minute commercial transit"}},
-                "accommodation": {"budget": ["Sector G-9 standard accommodations"], "luxury": ["Serena Hotel Islamabad", "Marriott Hotel"]},
-                "connectivity": {"mobile_networks": ["Universal 4G/5G coverage"], "internet": "Optimal high-speed connectivity across all vectors", "tips": "Utilize dedicated municipal transit paths for rapid sector-to-sector movement."}
-            },
-            {
-                "name": "Fairy Meadows",
-                "region": "Gilgit-Baltistan",
-                "access_level": "Difficult",
-                "altitude_m": 3300,
-                "best_season": "June - September",
-                "budget_per_day": {"budget": 8000},
-                "description": "An elevated, isolated alpine pasture functioning as the primary observational platform for Nanga Parbat, the ninth highest terrestrial summit globally.",
-                "history": "Historically utilized as a base camp for global mountaineering expeditions attempting the perilous ascent of the 'Killer Mountain'.",
-                "landmarks": [{"name": "Nanga Parbat Base Camp", "description": "The ultimate destination for advanced trekkers."}, {"name": "Reflection Lake", "description": "A pristine alpine pool mirroring the Nanga Parbat massif."}],
-                "activities": ["Strenuous high-altitude trekking", "Nocturnal astrophotography", "Survivalist camping"],
-                "transport": {"Islamabad": {"road": "16 hours to Raikot Bridge, followed by extreme off-road jeep transit and a 3-hour vertical hike"}},
-                "accommodation": {"budget": ["Basic wooden alpine huts"], "luxury": ["Premium glamping pods with localized heating"]},
-                "connectivity": {"mobile_networks": ["Severely restricted"], "internet": "Functional telecommunication blackout", "tips": "Satellite communication recommended for critical emergencies."}
-            },
-            {
-                "name": "Mohenjo-Daro",
-                "region": "Sindh",
-                "access_level": "Easy",
-                "altitude_m": 47,
-                "best_season": "November - February",
-                "budget_per_day": {"budget": 3500},
-                "description": "An archaeological masterwork representing one of the earliest and most sophisticated urban settlements in human history, situated adjacent to the Indus River.",
-                "history": "Flourishing circa 2500 BCE, this Indus Valley Civilization metropolis featured advanced civil engineering, including complex drainage systems and standardized brick architecture.",
-                "landmarks": [{"name": "The Great Bath", "description": "A monumental public aquatic structure."}, {"name": "The Buddhist Stupa", "description": "A subsequent addition overlaying the ancient ruins."}],
-                "activities": ["Archaeological site immersion", "Historical museum analysis"],
-                "transport": {"Karachi": {"road": "7-8 hours via the Indus Highway", "air": "Domestic flight to Sukkur followed by vehicular transit"}},
-                "accommodation": {"budget": ["Larkana municipal guest houses"], "luxury": ["PTDC Motel Larkana"]},
-                "connectivity": {"mobile_networks": ["Jazz", "Zong", "Telenor"], "internet": "Standard 3G/4G within the vicinity", "tips": "Deploy rigorous ultraviolet mitigation protocols during daylight hours."}
-            },
-            {
-                "name": "Neelum Valley",
-                "region": "Azad Kashmir",
-                "access_level": "Moderate",
-                "altitude_m": 1500,
-                "best_season": "May - October",
-                "budget_per_day": {"budget": 4500},
-                "description": "A bow-shaped, densely forested gorge spanning 144 kilometers, celebrated for its sapphire-hued river, cascading waterfalls, and profound tranquility.",
-                "history": "Serving as a critical historical artery in the Kashmir region, the valley is steeped in complex geopolitical history and regional folklore.",
-                "landmarks": [{"name": "Arang Kel", "description": "An idyllic, highly elevated settlement accessible via cable car."}, {"name": "Sharda", "description": "A breathtaking panoramic viewpoint containing ancient university ruins."}],
-                "activities": ["Riverine navigation", "Botanical exploration", "Alpine lodging"],
-                "transport": {"Islamabad": {"road": "8-10 hours via Muzaffarabad"}},
-                "accommodation": {"budget": ["Keran riverside huts"], "luxury": ["State-operated luxury cabins in Sharda"]},
-                "connectivity": {"mobile_networks": ["SCOM exclusive"], "internet": "Highly intermittent; substantial localized blackouts", "tips": "Verification of border proximity restrictions is mandatory prior to transit."}
-            }
-        ]
+    catalog = get_destination_catalog()
+    dests = catalog.all()
 
-    regions = sorted(set(d.get("region", "Unspecified Territory") for d in dests))
-    col1, col2 = st.columns(2)
+    query = st.text_input("🔎 Search the Archive", placeholder="e.g. Buddhist stupas, trout fishing, Mughal citadel", key="dest_search")
+    col1, col2, col3 = st.columns(3)
     with col1:
-        sel_region = st.selectbox("Isolate by Provincial Territory", ["Comprehensive Archival View"] + regions)
+        sel_region = st.selectbox("Isolate by Provincial Territory", ["Comprehensive Archival View"] + catalog.regions())
     with col2:
         sel_access = st.selectbox("Isolate by Accessibility Threshold", ["Unrestricted", "Easy", "Moderate", "Difficult"])
+    with col3:
+        sel_month = st.selectbox("Isolate by Travel Month", ["Any Month"] + MONTHS)
 
+    # Narrow through the catalog's prebuilt indexes, preserving archive order
     filtered = dests
     if sel_region != "Comprehensive Archival View":
-        filtered = [d for d in filtered if d.get("region") == sel_region]
+        filtered = catalog.in_region(sel_region)
     if sel_access != "Unrestricted":
-        filtered = [d for d in filtered if d.get("access_level") == sel_access]
+        allowed = {d["name"] for d in catalog.with_access(sel_access)}
+        filtered = [d for d in filtered if d["name"] in allowed]
+    if sel_month != "Any Month":
+        allowed = {d["name"] for d in catalog.in_season(MONTHS.index(sel_month) + 1)}
+        filtered = [d for d in filtered if d["name"] in allowed]
+
+    snippets = {}
+    if query.strip():
+        store = get_tourism_store()
+        if store:
+            hits = store.search(query)
+        else:
+            hits = [(d["name"], "") for d in filtered if query.lower() in json.dumps(d, ensure_ascii=False).lower()]
+        snippets = dict(hits)
+        # Keep the filters, but order by search relevance
+        allowed = {d["name"] for d in filtered}
+        filtered = [catalog.get(name) for name, _ in hits if name in allowed and catalog.get(name)]
 
     if not filtered:
         st.info("No topographical records match the designated parameters.")
         return
 
     selected = st.selectbox("Designate a Specific Geographic Locale", [d["name"] for d in filtered])
-    dest = next(d for d in filtered if d["name"] == selected)
+    dest = catalog.get(selected)
+    if snippets.get(selected):
+        st.markdown(f"<p style='color: var(--text-muted); font-family: \"Inter\", serif; font-style: italic;'>🔎 {snippets[selected]}</p>", unsafe_allow_html=True)
 
     st.markdown(f"<h3 style='color: var(--text-primary); font-family: \"Inter\", sans-serif;'>📍 {dest['name']} — <span style='color: var(--text-muted); font-weight: 400;'>{dest.get('region', 'Unspecified')}</span></h3>", unsafe_allow_html=True)
     
@@ -1026,6 +2895,20 @@ def page_destinations():
     budget = dest.get('budget_per_day', {}).get('budget', 'N/A')
     c4.metric("Estimated Daily Expenditure", f"PKR {budget:,}+" if isinstance(budget, int) else f"PKR {budget}+")
 
+    if "latitude" in dest and "longitude" in dest:
+        geo = get_geo_index()
+        lat, lon = dest["latitude"], dest["longitude"]
+        hospitals = geo.nearest(lat, lon, "hospital", k=3)
+        embassy = geo.nearest(lat, lon, "embassy", k=1)
+        nearby = geo.within(lat, lon, 150, "destination", exclude=dest["name"])
+        with st.expander("🏥 Proximate Medical, Diplomatic & Touristic Support", expanded=False):
+            for h in hospitals:
+                st.markdown(f"<li style='color:var(--text-secondary);'>⚕️ <b>{h['name']}</b> ({h['city']}) — {h['distance_km']:.0f} km · <code style='color:var(--text-accent);'>{h['phone']}</code> · Rescue <code>{h['rescue']}</code></li>", unsafe_allow_html=True)
+            for e in embassy:
+                st.markdown(f"<li style='color:var(--text-secondary);'>🛂 <b>{e['name']}</b> Mission ({e['city']}) — {e['distance_km']:.0f} km · <code>{e['phone']}</code></li>", unsafe_allow_html=True)
+            if nearby:
+                st.markdown("<b style='color:var(--text-primary);'>Destinations within 150 km:</b> " + ", ".join(f"{d['name']} ({d['distance_km']:.0f} km)" for d in nearby), unsafe_allow_html=True)
+
     st.markdown(f"<p style='font-size: 1.05em; color: var(--text-secondary); line-height: 1.7; font-family: \"Inter\", serif;'><b>📄 Topographical Synopsis:</b> {dest.get('description', '')}</p>", unsafe_allow_html=True)
 
     with st.expander("🏛️ Historical & Heritage Context", expanded=False):
@@ -1062,33 +2945,36 @@ def page_destinations():
             st.markdown(f"<p style='color:var(--text-secondary);'><b>Broadband Access:</b> {conn.get('internet', 'N/A')}</p>", unsafe_allow_html=True)
             st.markdown(f"<p style='color:var(--text-accent);'><b>💡 Strategic Advisory:</b> {conn.get('tips', 'N/A')}</p>", unsafe_allow_html=True)
 
+@timed_fragment
 def page_weather():
     st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🌤️ Meteorological Forecast & Conditions</h2>", unsafe_allow_html=True)
     st.markdown("<p style='font-size: 1.1em; color: var(--text-secondary); line-height: 1.8; font-family: \"Inter\", serif;'>Access real-time atmospheric data and extended meteorological projections to meticulously plan your expeditionary window.</p>", unsafe_allow_html=True)
     
-    dests = load_json("destinations.json")
-    
-    if not dests:
-        dests = [
-            {"name": "Hunza Valley", "region": "Gilgit-Baltistan", "latitude": 36.3167, "longitude": 74.6500},
-            {"name": "Skardu", "region": "Gilgit-Baltistan", "latitude": 35.2971, "longitude": 75.6333},
-            {"name": "Swat Valley", "region": "Khyber Pakhtunkhwa", "latitude": 35.2227, "longitude": 72.4258},
-            {"name": "Lahore", "region": "Punjab", "latitude": 31.5204, "longitude": 74.3587},
-            {"name": "Islamabad", "region": "Capital Territory", "latitude": 33.6844, "longitude": 73.0479},
-            {"name": "Fairy Meadows", "region": "Gilgit-Baltistan", "latitude": 35.3850, "longitude": 74.5786}
-        ]
+    catalog = get_destination_catalog()
+    dests = catalog.all()
 
     selected = st.selectbox("Designate Geographic Locale for Atmospheric Analysis", [d["name"] for d in dests], key="w_dest")
-    dest = next(d for d in dests if d["name"] == selected)
-    
-    lat = dest.get("latitude", 30.3753)
-    lon = dest.get("longitude", 69.3451)
+    dest = catalog.get(selected)
     
-    with st.spinner("Acquiring real-time meteorological telemetry..."):
-        weather = fetch_weather_tourism(lat, lon)
+    # Renders read the prefetcher's warm store only; the network is never on this path after warm-up
+    prefetcher = get_weather_prefetcher()
+    if not prefetcher.wait_until_warm(0):
+        with st.spinner("Acquiring real-time meteorological telemetry..."):
+            prefetcher.wait_until_warm(15)
+    store = prefetcher.snapshot()
+    weather, fetched_at = store.get(dest["name"], (None, None))
+    if weather is None:
+        # Not warm yet, or no coordinates of its own: fetch just this destination once (then cached)
+        prefetcher.refresh_missing(dest)
+        located = dict(dest, latitude=dest.get("latitude", 30.3753), longitude=dest.get("longitude", 69.3451))
+        with st.spinner("Acquiring real-time meteorological telemetry..."):
+            weather = fetch_weather_batch([located]).get(dest["name"])
+    all_weather = {name: data for name, (data, _) in store.items()}
         
     if weather and "current" in weather:
         st.markdown(f"<h3 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; margin-top: 20px;'>📍 Current Atmospheric Telemetry: {dest['name']}</h3>", unsafe_allow_html=True)
+        if fetched_at:
+            st.caption(f"🕒 Telemetry acquired {format_age(time.time() - fetched_at)}")
         c1, c2, c3 = st.columns(3)
         c1.metric("Thermal Reading", f"{weather['current']['temperature_2m']} °C")
         c2.metric("Relative Humidity", f"{weather['current']['relative_humidity_2m']} %")
@@ -1097,35 +2983,69 @@ def page_weather():
         if "daily" in weather:
             st.markdown("<h3 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; margin-top: 30px;'>📈 7-Day Extended Meteorological Projection</h3>", unsafe_allow_html=True)
             daily = weather["daily"]
-            df = pd.DataFrame({
-                "Date": daily["time"],
-                "Maximum Thermal (°C)": daily["temperature_2m_max"],
-                "Minimum Thermal (°C)": daily["temperature_2m_min"],
-                "Precipitation Volume (mm)": daily["precipitation_sum"]
-            })
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df["Date"], y=df["Maximum Thermal (°C)"], name="Max Thermal", line=dict(color="#e11d48", width=3)))
-            fig.add_trace(go.Scatter(x=df["Date"], y=df["Minimum Thermal (°C)"], name="Min Thermal", line=dict(color="#0284c7", width=3)))
-            fig.add_trace(go.Bar(x=df["Date"], y=df["Precipitation Volume (mm)"], name="Precipitation", marker_color="#059669", opacity=0.3, yaxis="y2"))
+
+            def build():
+                df = pd.DataFrame({
+                    "Date": daily["time"],
+                    "Maximum Thermal (°C)": daily["temperature_2m_max"],
+                    "Minimum Thermal (°C)": daily["temperature_2m_min"],
+                    "Precipitation Volume (mm)": daily["precipitation_sum"]
+                })
+                
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=df["Date"], y=df["Maximum Thermal (°C)"], name="Max Thermal", line=dict(color="#e11d48", width=3)))
+                fig.add_trace(go.Scatter(x=df["Date"], y=df["Minimum Thermal (°C)"], name="Min Thermal", line=dict(color="#0284c7", width=3)))
+                fig.add_trace(go.Bar(x=df["Date"], y=df["Precipitation Volume (mm)"], name="Precipitation", marker_color="#059669", opacity=0.3, yaxis="y2"))
+                
+                template = "plotly_dark" if st.session_state.theme == "dark" else "plotly"
+                fig.update_layout(
+                    yaxis2=dict(title="Precipitation (mm)", overlaying="y", side="right"),
+                    yaxis=dict(title="Thermal Reading (°C)"),
+                    legend=dict(orientation="h", y=1.12),
+                    height=450,
+                    margin=dict(l=20, r=20, t=40, b=20),
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    template=template
+                )
+                fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='var(--border-color)')
+                fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='var(--border-color)')
+                return fig
             
+            # The prefetcher's fetch time is the forecast's data version; a foreground fetch has its observation time
+            plotly_cached("weather_forecast", fetched_at or weather["current"].get("time"), dest["name"], build)
+    else:
+        st.error("Meteorological telemetry currently inaccessible. Please initiate a retry sequence.")
+    
+    comparable = {name: w for name, w in all_weather.items() if "daily" in w}
+    if len(comparable) > 1:
+        st.markdown("<h3 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; margin-top: 30px;'>🗺️ Multi-Destination Thermal Comparison</h3>", unsafe_allow_html=True)
+        def build_cmp():
+            df_cmp = pd.DataFrame([
+                {"Date": day, "Destination": name, "Maximum Thermal (°C)": t_max}
+                for name, w in comparable.items()
+                for day, t_max in zip(w["daily"]["time"], w["daily"]["temperature_2m_max"])
+            ])
             template = "plotly_dark" if st.session_state.theme == "dark" else "plotly"
-            fig.update_layout(
-                yaxis2=dict(title="Precipitation (mm)", overlaying="y", side="right"),
-                yaxis=dict(title="Thermal Reading (°C)"),
+            fig_cmp = px.line(df_cmp, x="Date", y="Maximum Thermal (°C)", color="Destination", markers=True, template=template)
+            fig_cmp.update_layout(
                 legend=dict(orientation="h", y=1.12),
                 height=450,
                 margin=dict(l=20, r=20, t=40, b=20),
                 plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                template=template
+                paper_bgcolor="rgba(0,0,0,0)"
             )
-            fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='var(--border-color)')
-            fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='var(--border-color)')
-            
-            st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.error("Meteorological telemetry currently inaccessible. Please initiate a retry sequence.")
+            return fig_cmp
+
+        version = tuple(sorted((name, store[name][1]) for name in comparable))
+        plotly_cached("weather_comparison", version, "all", build_cmp)
+        
+        current_rows = [
+            {"Destination": name, "Thermal Reading (°C)": w["current"]["temperature_2m"], "Relative Humidity (%)": w["current"]["relative_humidity_2m"], "Prevailing Conditions": weather_code_to_text(w["current"]["weather_code"])}
+            for name, w in comparable.items() if "current" in w
+        ]
+        if current_rows:
+            st.dataframe(pd.DataFrame(current_rows), use_container_width=True, hide_index=True)
 
 def page_smart_assistant():
     st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🧠 Artificial Intelligence Concierge</h2>", unsafe_allow_html=True)
@@ -1134,44 +3054,40 @@ def page_smart_assistant():
     for msg in st.session_state.tourism_chat_history:
         st.chat_message(msg["role"]).write(msg["content"])
     if prompt:
-        client = Groq(api_key=GROQ_KEY)
         messages = [{"role": "system", "content": TOURISM_SYSTEM_PROMPT}] + st.session_state.tourism_chat_history
-        res = client.chat.completions.create(messages=sanitize_messages(messages), model="llama-3.3-70b-versatile")
-        reply = res.choices[0].message.content
-        st.chat_message("assistant").write(reply)
+        with st.chat_message("assistant"):
+            reply = render_ai_stream(stream_ai_response(sanitize_messages(messages), model="llama-3.3-70b-versatile"))
         st.session_state.tourism_chat_history.append({"role": "assistant", "content": reply})
 
-def page_maps():
-    st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🗺️ Interactive Geospatial Mapping</h2>", unsafe_allow_html=True)
-    destinations = load_json("destinations.json")
-    
-    if not destinations:
-        destinations = [
-            {"name": "Hunza Valley", "region": "Gilgit-Baltistan", "access_level": "Moderate", "latitude": 36.3167, "longitude": 74.6500, "altitude_m": 2438, "best_season": "April - October", "budget_per_day": {"budget": 5000}},
-            {"name": "Skardu", "region": "Gilgit-Baltistan", "access_level": "Moderate", "latitude": 35.2971, "longitude": 75.6333, "altitude_m": 2228, "best_season": "May - September", "budget_per_day": {"budget": 6000}},
-            {"name": "Swat Valley", "region": "Khyber Pakhtunkhwa", "access_level": "Easy", "latitude": 35.2227, "longitude": 72.4258, "altitude_m": 980, "best_season": "March - October", "budget_per_day": {"budget": 4000}},
-            {"name": "Lahore", "region": "Punjab", "access_level": "Easy", "latitude": 31.5204, "longitude": 74.3587, "altitude_m": 217, "best_season": "October - March", "budget_per_day": {"budget": 3000}},
-            {"name": "Fairy Meadows", "region": "Gilgit-Baltistan", "access_level": "Difficult", "latitude": 35.3850, "longitude": 74.5786, "altitude_m": 3300, "best_season": "June - September", "budget_per_day": {"budget": 8000}},
-            {"name": "Mohenjo-Daro", "region": "Sindh", "access_level": "Easy", "latitude": 27.3292, "longitude": 68.1389, "altitude_m": 47, "best_season": "November - February", "budget_per_day": {"budget": 3500}}
-        ]
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        show_dest = st.checkbox("📍 Display Topographical Markers", value=True)
-    with col2:
-        show_routes = st.checkbox("🛣️ Illuminate Primary Transit Arteries", value=True)
-    with col3:
-        map_lang = st.radio("🌐 Linguistic Preference", ["English", "اردو (Urdu)"], horizontal=True, key="map_lang")
-        
-    st.markdown("<p style='font-family: \"Inter\", sans-serif; color:var(--text-muted);'>🟢 <b>High Accessibility</b> | 🟠 <b>Intermediate Accessibility</b> | 🔴 <b>Restricted / Expeditionary</b></p>", unsafe_allow_html=True)
-    
+MAP_ROUTES = [
+    {"name": "N-35 Karakoram Highway (KKH)", "color": "#1B5E20", "coords": [[35.92,74.31],[36.05,74.50],[36.32,74.65],[36.46,74.88],[36.30,75.10],[35.88,74.48],[35.55,75.20],[35.30,75.63]]},
+    {"name": "M-2 Motorway (Islamabad → Lahore)", "color": "#0D47A1", "coords": [[33.68,73.05],[33.50,73.10],[33.10,72.80],[32.70,72.60],[32.16,72.68],[31.85,73.50],[31.55,74.34]]},
+    {"name": "N-15 Swat Expressway", "color": "#6A1B9A", "coords": [[33.95,72.35],[34.20,72.10],[34.50,72.05],[34.77,72.36],[35.22,72.35]]},
+    {"name": "N-5 GT Road (Lahore → Karachi)", "color": "#E65100", "coords": [[31.55,74.34],[31.40,74.20],[30.20,71.47],[28.42,68.77],[27.60,68.35],[25.39,68.37],[24.86,67.08]]},
+    {"name": "N-25 RCD Highway (Karachi → Quetta)", "color": "#B71C1C", "coords": [[24.86,67.08],[25.50,66.60],[26.20,66.00],[27.00,66.50],[28.50,66.80],[29.50,66.90],[30.18,66.97]]}
+]
+
+# English uses CARTO Voyager, Urdu the OSM standard style; "layer" is the tile_proxy.py layer name
+MAP_TILE_LAYERS = {
+    "en": {"layer": "voyager", "url": "https://{s}.basemaps.cartocdn.com/rastertiles/voyager/{z}/{x}/{y}{r}.png",
+           "attribution": "&copy; OpenStreetMap &copy; CARTO", "maxZoom": 19},
+    "ur": {"layer": "osm", "url": "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png",
+           "attribution": "&copy; OpenStreetMap", "maxZoom": 18},
+}
+
+@st.cache_resource(max_entries=16)
+def _build_map_document(show_dest, show_routes, show_support, lang, stamp):
+    """The Leaflet document for one combination of toggles, language and data version."""
+    destinations = get_destination_catalog().all()
     marker_colors = {"Easy": "#4CAF50", "Moderate": "#FF9800", "Difficult": "#F44336"}
     markers_data = []
+    geo = get_geo_index()
     if show_dest and destinations:
         for d in destinations:
             color = marker_colors.get(d.get("access_level", ""), "#2196F3")
             budget_val = d.get('budget_per_day', {}).get('budget', 'N/A')
             budget_str = f"PKR {budget_val:,}+/day" if isinstance(budget_val, int) else f"PKR {budget_val}+/day"
+            hospital = geo.nearest(d["latitude"], d["longitude"], "hospital", k=1) if "latitude" in d and "longitude" in d else []
             markers_data.append({
                 "lat": d.get("latitude", 30.0),
                 "lng": d.get("longitude", 70.0),
@@ -1181,29 +3097,31 @@ def page_maps():
                 "budget": budget_str,
                 "altitude": f"{d.get('altitude_m', 0):,}m",
                 "season": d.get("best_season", "N/A"),
+                "hospital": f"{hospital[0]['name']} ({hospital[0]['distance_km']:.0f} km)" if hospital else "N/A",
                 "color": color
             })
     markers_json = json.dumps(markers_data, ensure_ascii=False)
 
-    routes_data = []
-    if show_routes:
-        routes_data = [
-            {"name": "N-35 Karakoram Highway (KKH)", "color": "#1B5E20", "coords": [[35.92,74.31],[36.05,74.50],[36.32,74.65],[36.46,74.88],[36.30,75.10],[35.88,74.48],[35.55,75.20],[35.30,75.63]]},
-            {"name": "M-2 Motorway (Islamabad → Lahore)", "color": "#0D47A1", "coords": [[33.68,73.05],[33.50,73.10],[33.10,72.80],[32.70,72.60],[32.16,72.68],[31.85,73.50],[31.55,74.34]]},
-            {"name": "N-15 Swat Expressway", "color": "#6A1B9A", "coords": [[33.95,72.35],[34.20,72.10],[34.50,72.05],[34.77,72.36],[35.22,72.35]]},
-            {"name": "N-5 GT Road (Lahore → Karachi)", "color": "#E65100", "coords": [[31.55,74.34],[31.40,74.20],[30.20,71.47],[28.42,68.77],[27.60,68.35],[25.39,68.37],[24.86,67.08]]},
-            {"name": "N-25 RCD Highway (Karachi → Quetta)", "color": "#B71C1C", "coords": [[24.86,67.08],[25.50,66.60],[26.20,66.00],[27.00,66.50],[28.50,66.80],[29.50,66.90],[30.18,66.97]]}
-        ]
-    routes_json = json.dumps(routes_data, ensure_ascii=False)
+    support_data = []
+    if show_support:
+        icons = {"hospital": "⚕️", "embassy": "🛂"}
+        for kind, (items, *_) in geo.kinds.items():
+            if kind in icons:
+                support_data += [{"lat": p["lat"], "lng": p["lon"], "label": f"{icons[kind]} {p['name']} · {p['phone']}"} for p in items]
+    support_json = json.dumps(support_data, ensure_ascii=False)
+    routes_json = json.dumps(MAP_ROUTES if show_routes else [], ensure_ascii=False)
 
-    map_html = f"""
+    return f"""
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="utf-8" />
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
+        <link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.5.3/dist/MarkerCluster.css" />
+        <link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.5.3/dist/MarkerCluster.Default.css" />
         <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+        <script src="https://unpkg.com/leaflet.markercluster@1.5.3/dist/leaflet.markercluster.js"></script>
         <style>
             body {{ margin: 0; padding: 0; background: var(--bg-primary); }}
             #map {{ width: 100%; height: 580px; border-radius: 12px; border: 1px solid var(--border-color); }}
@@ -1215,24 +3133,16 @@ def page_maps():
     <body>
         <div id="map"></div>
         <script>
-            var map = L.map('map').setView([30.3753, 69.3451], 5);
-            var lang = '{"en" if map_lang == "English" else "ur"}';
-            
-            if (lang === 'en') {{
-                L.tileLayer('https://{{s}}.basemaps.cartocdn.com/rastertiles/voyager/{{z}}/{{x}}/{{y}}{{r}}.png', {{
-                    attribution: '&copy; OpenStreetMap &copy; CARTO',
-                    maxZoom: 19
-                }}).addTo(map);
-            }} else {{
-                L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{
-                    attribution: '&copy; OpenStreetMap',
-                    maxZoom: 18
-                }}).addTo(map);
-            }}
-
-            var markers = {markers_json};
-            markers.forEach(function(m) {{
-                var popupContent = '<div class="dest-popup">' +
+            var TILE_PROXY = {json.dumps(TILE_PROXY_URL)};
+            var map = L.map('map', {{preferCanvas: true}}).setView([30.3753, 69.3451], 5);
+            var tiles = {json.dumps(MAP_TILE_LAYERS[lang])};
+            L.tileLayer(TILE_PROXY ? TILE_PROXY + '/' + tiles.layer + '/{{z}}/{{x}}/{{y}}.png' : tiles.url, {{
+                attribution: tiles.attribution,
+                maxZoom: tiles.maxZoom
+            }}).addTo(map);
+
+            function destPopup(m) {{
+                return '<div class="dest-popup">' +
                     '<h4>' + m.name + '</h4>' +
                     '<p style="color:var(--text-muted);">' + m.region + '</p>' +
                     '<hr>' +
@@ -1240,13 +3150,45 @@ def page_maps():
                     '<p>📍 Index: <b style="color:'+m.color+';">' + m.access + '</b></p>' +
                     '<p>📅 Optimal: ' + m.season + '</p>' +
                     '<p>💳 ' + m.budget + '</p>' +
+                    '<p>🏥 Nearest care: ' + m.hospital + '</p>' +
                     '</div>';
-                
-                L.circleMarker([m.lat, m.lng], {{
+            }}
+
+            // Points become Leaflet layers only once the (padded) viewport reaches them, and
+            // are clustered client-side, so thousands of points cost a few hundred live layers.
+            function lazyLayer(points, makeMarker, options) {{
+                var group = L.markerClusterGroup(Object.assign({{chunkedLoading: true, showCoverageOnHover: false}}, options));
+                var loaded = new Uint8Array(points.length);
+                function loadVisible() {{
+                    var bounds = map.getBounds().pad(0.5), batch = [];
+                    for (var i = 0; i < points.length; i++) {{
+                        if (!loaded[i] && bounds.contains([points[i].lat, points[i].lng])) {{
+                            loaded[i] = 1;
+                            batch.push(makeMarker(points[i]));
+                        }}
+                    }}
+                    if (batch.length) group.addLayers(batch);
+                }}
+                if (points.length) {{
+                    map.addLayer(group);
+                    map.on('moveend', loadVisible);
+                    loadVisible();
+                }}
+            }}
+
+            lazyLayer({markers_json}, function(m) {{
+                return L.circleMarker([m.lat, m.lng], {{
                     radius: 10, fillColor: m.color, color: '#fff', weight: 2,
                     opacity: 1, fillOpacity: 0.85
-                }}).addTo(map).bindPopup(popupContent).bindTooltip(m.name);
-            }});
+                }}).bindPopup(function() {{ return destPopup(m); }}).bindTooltip(m.name);
+            }}, {{maxClusterRadius: 40}});
+
+            lazyLayer({support_json}, function(s) {{
+                return L.circleMarker([s.lat, s.lng], {{
+                    radius: 6, fillColor: '#FFFFFF', color: '#D32F2F', weight: 3,
+                    opacity: 1, fillOpacity: 1
+                }}).bindTooltip(s.label);
+            }}, {{maxClusterRadius: 60}});
 
             var routes = {routes_json};
             routes.forEach(function(r) {{
@@ -1258,37 +3200,36 @@ def page_maps():
     </body>
     </html>
     """
-    components.html(map_html, height=600)
 
+@timed_fragment
+def page_maps():
+    st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🗺️ Interactive Geospatial Mapping</h2>", unsafe_allow_html=True)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        show_dest = st.checkbox("📍 Display Topographical Markers", value=True)
+    with col2:
+        show_routes = st.checkbox("🛣️ Illuminate Primary Transit Arteries", value=True)
+    with col3:
+        show_support = st.checkbox("🏥 Display Medical & Diplomatic Posts", value=False)
+    with col4:
+        map_lang = st.radio("🌐 Linguistic Preference", ["English", "اردو (Urdu)"], horizontal=True, key="map_lang")
+        
+    st.markdown("<p style='font-family: \"Inter\", sans-serif; color:var(--text-muted);'>🟢 <b>High Accessibility</b> | 🟠 <b>Intermediate Accessibility</b> | 🔴 <b>Restricted / Expeditionary</b></p>", unsafe_allow_html=True)
+
+    # Same key as the geo index, whose hospitals and embassies feed the popups and support layer
+    lang = "en" if map_lang == "English" else "ur"
+    components.html(_build_map_document(show_dest, show_routes, show_support, lang, geo_stamp()), height=600)
+
+@timed_fragment
 def page_budget():
     st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>📊 Financial Architecture & Resource Allocation</h2>", unsafe_allow_html=True)
     
-    budget_data = load_json("budget_templates.json")
-    destinations = load_json("destinations.json")
-    
-    if not destinations:
-        destinations = [{"name": "Hunza Valley"}, {"name": "Skardu"}, {"name": "Swat Valley"}, {"name": "Lahore"}]
+    budget_data = load_tourism_data("budget_templates.json")
+    destinations = get_destination_catalog().all()
         
     if not budget_data or "categories" not in budget_data:
-        budget_data = {
-            "travel_styles": ["Budget", "Standard", "Luxury"],
-            "categories": [
-                {"name": "Premium Accommodations", "icon": "🏨", "budget": 2000, "standard": 5000, "luxury": 15000},
-                {"name": "Culinary Sustenance", "icon": "🍽️", "budget": 1200, "standard": 3000, "luxury": 8000},
-                {"name": "Logistical Transit", "icon": "🚙", "budget": 800, "standard": 2500, "luxury": 8000},
-                {"name": "Excursions & Admissions", "icon": "🎟️", "budget": 300, "standard": 1000, "luxury": 3000},
-                {"name": "Telecommunications", "icon": "📡", "budget": 150, "standard": 300, "luxury": 500},
-                {"name": "Contingency Capital", "icon": "💼", "budget": 500, "standard": 1500, "luxury": 5000}
-            ],
-            "currency_rates": {
-                "USD": 0.0036, "EUR": 0.0033, "GBP": 0.0028, "AED": 0.013, "CNY": 0.026
-            },
-            "tips": [
-                "Utilize verified ride-hailing networks (Careem/InDrive) in lieu of traditional municipal taxis to ensure pricing transparency.",
-                "Engage with localized gastronomic establishments for an authentic and economically optimized culinary experience.",
-                "Execute lodging reservations pre-emptively during peak meteorological windows (June–August) to avert demand-surge pricing."
-            ]
-        }
+        budget_data = FALLBACK_BUDGET_TEMPLATES
 
     st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif;'>Parametrize Your Expedition</h4>", unsafe_allow_html=True)
     
@@ -1300,109 +3241,88 @@ def page_budget():
         style = st.selectbox("Designate Expenditure Tier", budget_data.get("travel_styles", ["Budget", "Standard", "Luxury"]))
         num_people = st.slider("Total Personnel Count", 1, 10, 2)
         
-    style_key = style.lower()
-    categories = budget_data.get("categories", [])
+    engine = get_budget_engine(budget_data, destinations)
+    categories = engine.categories
+    multiplier = engine.multiplier(sel_dest, style)
+    costs = engine.breakdown(sel_dest, style, num_days, num_people)
+    total = engine.total(sel_dest, style, num_days, num_people)
     
-    items = []
-    total = 0
-    pie_data = []
-    pie_labels = []
-    
-    for cat in categories:
-        daily = cat.get(style_key, 0)
-        cost = daily * num_days * num_people
-        total += cost
-        items.append({
-            "Financial Category": f"{cat.get('icon','')} {cat['name']}", 
-            "Per Capita Daily Allocation (PKR)": f"{daily:,}", 
-            "Cumulative Valuation (PKR)": f"{cost:,}"
-        })
-        pie_data.append(cost)
-        pie_labels.append(cat['name'])
+    items = pd.DataFrame({
+        "Financial Category": [f"{cat.get('icon','')} {cat['name']}" for cat in categories],
+        "Per Capita Daily Allocation (PKR)": [f"{int(round(cat.get(style.lower(), 0) * multiplier)):,}" for cat in categories],
+        "Cumulative Valuation (PKR)": [f"{int(c):,}" for c in costs],
+    })
         
     st.divider()
-    c1, c2, c3 = st.columns(3)
+    c1, c2, c3, c4 = st.columns(4)
     c1.metric("💵 Total Capital Required", f"PKR {total:,}")
     c2.metric("👤 Per Capita Liability", f"PKR {total // max(num_people,1):,}")
     c3.metric("📅 Daily Burn Rate", f"PKR {total // max(num_days,1):,}")
+    c4.metric("📍 Destination Cost Index", f"{multiplier:.2f}×")
     
-    st.dataframe(pd.DataFrame(items), use_container_width=True, hide_index=True)
+    fx = get_currency_rates().get(budget_data.get("currency_rates", {}).keys(), budget_data.get("currency_rates", {}))
+    if fx["rates"]:
+        # One vectorized conversion gives every category in every currency
+        items = pd.concat([items, convert_currencies(costs, fx["rates"])], axis=1)
+    st.dataframe(items, use_container_width=True, hide_index=True)
     
     st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; margin-top:20px;'>Proportional Expenditure Allocation</h4>", unsafe_allow_html=True)
     template = "plotly_dark" if st.session_state.theme == "dark" else "plotly"
-    fig = px.pie(values=pie_data, names=pie_labels, color_discrete_sequence=px.colors.qualitative.Set3, template=template)
+    fig = px.pie(values=costs, names=[cat['name'] for cat in categories], color_discrete_sequence=px.colors.qualitative.Set3, template=template)
     fig.update_traces(textposition="inside", textinfo="percent+label")
     st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; margin-top:20px;'>🧮 Comparative Destination Costing</h4>", unsafe_allow_html=True)
+    st.caption(f"{style} tier · {num_days} days · {num_people} travellers, for every destination in the archive.")
+    comparison = engine.compare(style, num_days, num_people)
+    st.dataframe(comparison, use_container_width=True, hide_index=True,
+                 column_config={c: st.column_config.NumberColumn(format="%d") for c in ("Total (PKR)", "Per Capita (PKR)", "Daily Burn (PKR)")})
+    heat = engine.heatmap(style, num_people)
+    fig = px.imshow(heat, aspect="auto", color_continuous_scale="YlOrRd", template=template,
+                    labels={"x": "Expedition Duration (Days)", "y": "Destination", "color": "Total (PKR)"})
+    fig.update_layout(height=max(300, 40 * len(heat)), margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; margin-top:20px;'>🎯 Budget-Constrained Expedition Optimizer</h4>", unsafe_allow_html=True)
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        cap = st.number_input("Total Capital Ceiling (PKR)", min_value=5000, max_value=10_000_000, value=150_000, step=5000, key="opt_budget")
+    with c2:
+        objective = st.radio("Optimization Objective", ["Maximize Expedition Days", "Maximize Destinations Visited"], key="opt_objective")
+    with c3:
+        min_stay, max_stay = st.slider("Stay per Destination (Days)", 1, 14, (2, 7), key="opt_stay")
+    plan, spent = optimize_trip(engine, style, num_people, cap, "days" if objective.startswith("Maximize Expedition") else "destinations", min_stay, max_stay)
+    if plan:
+        c1, c2, c3 = st.columns(3)
+        c1.metric("🗓️ Total Days", sum(days for _, days, _ in plan))
+        c2.metric("📍 Destinations", len(plan))
+        c3.metric("💵 Capital Deployed", f"PKR {spent:,}", f"PKR {cap - spent:,} remaining", delta_color="off")
+        st.dataframe(pd.DataFrame(plan, columns=["Destination", "Days", "Cost (PKR)"]), use_container_width=True, hide_index=True)
+        st.caption(f"{style} tier for {num_people} travellers; inter-destination transit is not included.")
+    else:
+        st.warning("The designated ceiling cannot fund the minimum stay at any destination for this tier and party size.")
     
     st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; margin-top:10px;'>Global Currency Conversion</h4>", unsafe_allow_html=True)
-    rates = budget_data.get("currency_rates", {})
-    sel_currency = st.selectbox("Designate Target Currency", [c for c in rates.keys()])
-    rate = rates.get(sel_currency, 1)
-    st.info(f"**Calculated Exchange:** PKR {total:,} ≈ **{sel_currency} {total * rate:,.2f}**")
+    if fx["rates"]:
+        totals = convert_currencies([total, total // max(num_people, 1), total // max(num_days, 1)], fx["rates"])
+        totals.insert(0, "PKR", [total, total // max(num_people, 1), total // max(num_days, 1)])
+        totals.index = ["Total Capital", "Per Capita", "Daily Burn"]
+        st.dataframe(totals, use_container_width=True)
+        age = f" · updated {format_age(time.time() - fx['fetched_at'])}" if fx["fetched_at"] else ""
+        st.caption({"live": "💱 Live exchange rates", "last-known-good": "⚠️ Rate feed unavailable; showing last known rates",
+                    "static": "💱 Reference rates from the budget templates"}[fx["source"]] + age)
     
     st.divider()
     st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif;'>💡 Strategic Fiscal Optimization Directives</h4>", unsafe_allow_html=True)
     for tip in budget_data.get("tips", []):
         st.markdown(f"<li style='color:var(--text-secondary); font-family: \"Inter\", serif;'>{tip}</li>", unsafe_allow_html=True)
 
+@timed_fragment
 def page_emergency():
     st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🛡️ Critical Response & Emergency Protocols</h2>", unsafe_allow_html=True)
     st.error("**In the event of an exigency, initiate contact immediately:** Law Enforcement **15** | Rapid Rescue **1122** | Medical Evacuation **115** | Fire Services **16**")
     
-    data = load_json("emergency_contacts.json")
-    
-    if not data:
-        data = {
-            "national": [
-                {"service": "Federal Police Emergency Command", "number": "15", "coverage": "Nationwide"},
-                {"service": "Rapid Deployment Rescue 1122", "number": "1122", "coverage": "Punjab, KPK, Islamabad, AJK, GB"},
-                {"service": "Edhi Foundation Medical Evacuation", "number": "115", "coverage": "Nationwide"},
-                {"service": "Municipal Fire Brigade Services", "number": "16", "coverage": "Nationwide"},
-                {"service": "National Tourism Assistance Protocol", "number": "1422", "coverage": "Nationwide"},
-                {"service": "Federal Motorway Security Forces", "number": "130", "coverage": "All Federal Transit Arteries"},
-                {"service": "Federal Investigation Agency (FIA)", "number": "9911", "coverage": "Nationwide"},
-                {"service": "National Disaster Management Authority", "number": "051-9205037", "coverage": "Nationwide"}
-            ],
-            "regional": {
-                "Punjab": {
-                    "rescue": "1122",
-                    "police": "15",
-                    "hospitals": [
-                        {"name": "Mayo Premier Medical Facility", "city": "Lahore", "phone": "042-99211111"},
-                        {"name": "Services Hospital Complex", "city": "Lahore", "phone": "042-99200601"},
-                        {"name": "Nishtar Hospital Pavilion", "city": "Multan", "phone": "061-9200432"},
-                        {"name": "Allied Regional Medical Center", "city": "Faisalabad", "phone": "041-9210079"}
-                    ]
-                },
-                "Sindh": {
-                    "rescue": "1122 / 115",
-                    "police": "15",
-                    "hospitals": [
-                        {"name": "Jinnah Postgraduate Medical Centre", "city": "Karachi", "phone": "021-99201300"},
-                        {"name": "Civil Hospital Central Infrastructure", "city": "Karachi", "phone": "021-99215740"}
-                    ]
-                },
-                "Gilgit-Baltistan": {
-                    "rescue": "1122",
-                    "police": "15",
-                    "hospitals": [
-                        {"name": "District Headquarters (DHQ) Gilgit", "city": "Gilgit", "phone": "05811-920253"},
-                        {"name": "District Headquarters (DHQ) Skardu", "city": "Skardu", "phone": "05815-920282"}
-                    ]
-                }
-            },
-            "embassies": [
-                {"country": "United States of America", "city": "Islamabad", "phone": "051-2014000", "address": "Diplomatic Enclave, Ramna 5"},
-                {"country": "United Kingdom", "city": "Islamabad", "phone": "051-2012000", "address": "Diplomatic Enclave, Ramna 5"},
-                {"country": "People's Republic of China", "city": "Islamabad", "phone": "051-2260113", "address": "No. 1, Zhou-Enlai Avenue, Diplomatic Enclave"}
-            ],
-            "tourist_police": {
-                "description": "Specialized constabulary units deployed specifically to facilitate, protect, and escort international and domestic travelers.",
-                "contacts": [
-                    {"service": "Islamabad Tourism Constabulary", "phone": "1015"}
-                ]
-            }
-        }
+    data = load_emergency_contacts()
 
     st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif;'>📞 Federal Emergency Infrastructures</h4>", unsafe_allow_html=True)
     for contact in data.get("national", []):
@@ -1445,83 +3365,13 @@ def page_gallery():
     st.markdown("<h2 style='color: var(--text-primary); font-family: \"Inter\", sans-serif; font-weight: 700; margin-bottom: 20px; border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🖼️ Curated Visual Archives</h2>", unsafe_allow_html=True)
     st.markdown("<p style='font-size: 1.1em; color: var(--text-secondary); line-height: 1.8; font-family: \"Inter\", serif;'>Engage with a high-fidelity visual compendium showcasing the profound topographical and architectural heritage of Pakistan.</p>", unsafe_allow_html=True)
     
-    dests = load_json("destinations.json")
-    
-    if not dests or not any(d.get("gallery_images") for d in dests):
-        dests = [
-            {
-                "name": "Hunza Valley",
-                "region": "Gilgit-Baltistan",
-                "gallery_images": [
-                    "https://images.unsplash.com/photo-1589553416260-f586c8f1514f?auto=format&fit=crop&w=800&q=80", 
-                    "https://images.unsplash.com/photo-1627896157734-4bc0a2b027b4?auto=format&fit=crop&w=800&q=80", 
-                    "https://images.unsplash.com/photo-1600100397608-f010f423b971?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1542358814-c18d1840801a?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1506905925346-21bda4d32df4?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1464822759023-fed622ff2c3b?auto=format&fit=crop&w=800&q=80"
-                ]
-            },
-            {
-                "name": "Skardu",
-                "region": "Gilgit-Baltistan",
-                "gallery_images": [
-                    "https://images.unsplash.com/photo-1621217036665-27a3c75eb2a7?auto=format&fit=crop&w=800&q=80", 
-                    "https://images.unsplash.com/photo-1595166373721-653557e4e164?auto=format&fit=crop&w=800&q=80", 
-                    "https://images.unsplash.com/photo-1633511116666-9eebc3f25b2d?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1454496522488-7a8e488e8606?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1469334031218-e382a71b716b?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1434394354979-a235cd36269d?auto=format&fit=crop&w=800&q=80"
-                ]
-            },
-            {
-                "name": "Lahore",
-                "region": "Punjab",
-                "gallery_images": [
-                    "https://images.unsplash.com/photo-1584288079521-4f1816bb6e4b?auto=format&fit=crop&w=800&q=80", 
-                    "https://images.unsplash.com/photo-1610408552174-8b65e90dcb0a?auto=format&fit=crop&w=800&q=80", 
-                    "https://images.unsplash.com/photo-1620358823101-b6a482b8a0df?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1524231757912-21f4fe3a7200?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1513635269975-59663e0ac1ad?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1518398046578-8cca57782e17?auto=format&fit=crop&w=800&q=80"
-                ]
-            },
-            {
-                "name": "Swat Valley",
-                "region": "Khyber Pakhtunkhwa",
-                "gallery_images": [
-                    "https://images.unsplash.com/photo-1624389964522-42171850119b?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1650367310574-12eb60f09a15?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1601931535038-1647a7b8e5c6?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1433086966358-54859d0ed716?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1472214103451-9374bd1c798e?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1501785888041-af3ef285b470?auto=format&fit=crop&w=800&q=80"
-                ]
-            },
-            {
-                "name": "Islamabad",
-                "region": "Capital Territory",
-                "gallery_images": [
-                    "https://images.unsplash.com/photo-1601004838634-11883c8c7eb2?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1622396481328-9b1b78cdd9fd?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1579208035657-320d3f2fcb9f?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1510414842594-a61c69b5ae57?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1444703686981-a3abbc4d4fe3?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1449844908441-8829872d2607?auto=format&fit=crop&w=800&q=80"
-                ]
-            },
-            {
-                "name": "Fairy Meadows",
-                "region": "Gilgit-Baltistan",
-                "gallery_images": [
-                    "https://images.unsplash.com/photo-1516466723877-e4ec1d736c8a?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1513836279014-a89f7a76ae86?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1483728642387-6c3ba6c6af5f?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1506744626753-1492d2426c11?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1454496522488-7a8e488e8606?auto=format&fit=crop&w=800&q=80",
-                    "https://images.unsplash.com/photo-1469334031218-e382a71b716b?auto=format&fit=crop&w=800&q=80"
-                ]
-            }
-        ]
+    dests = get_destination_catalog().all()
+    
+    if not any(d.get("gallery_images") for d in dests):
+        dests = [d for d in FALLBACK_DESTINATIONS if d.get("gallery_images")]
+
+    # Queue thumbnails for the whole archive; images not ready yet fall back to the source URL
+    get_thumbnail_cache().ensure([url for d in dests for url in d.get("gallery_images", [])])
 
     dest_names = ["Isolate Comprehensive Archive"] + [d["name"] for d in dests]
     sel = st.selectbox("Designate Archival Target", dest_names, key="gal_dest")
@@ -1539,7 +3389,7 @@ def page_gallery():
                 with cols[i % 3]:
                     st.markdown(f"""
                     <div class="gallery-img-container">
-                        <img src="{img_url}" alt="{dest['name']}">
+                        {responsive_img(img_url, dest['name'])}
                         <p class="gallery-img-caption">Topographical Capture of {dest['name']}</p>
                     </div>
                     """, unsafe_allow_html=True)
@@ -1722,6 +3572,81 @@ def page_admin():
             st.rerun()
         st.info("System Configuration Active: Modulate the internal JSON architecture within the 'data' directory to execute extensive systemic alterations.")
 
+        st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif;'>🗄️ Cache Telemetry</h4>", unsafe_allow_html=True)
+        stats = get_weather_cache().stats()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Weather Cache Hits", stats["hits"])
+        c2.metric("Weather Cache Misses", stats["misses"])
+        c3.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+        c4.metric("Entries", f"{stats['size']} / {stats['max_entries']}")
+        if st.button("Purge Weather Cache"):
+            get_weather_cache().clear()
+            st.rerun()
+
+        llm_stats = get_llm_cache().stats()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("AI Response Cache Hits", llm_stats["hits"])
+        c2.metric("Hit Rate", f"{llm_stats['hit_rate']:.0%}")
+        c3.metric("Tokens Saved", f"{llm_stats['saved_tokens']:,}")
+        c4.metric("Stored", f"{llm_stats['entries']} / {llm_stats['bytes'] / 1e6:.1f} MB")
+        if st.button("Purge AI Response Cache"):
+            get_llm_cache().clear()
+            st.rerun()
+
+        tavily_stats = get_tavily_cache().stats()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Web Search Cache Hits", tavily_stats["hits"])
+        c2.metric("Hit Rate", f"{tavily_stats['hit_rate']:.0%}")
+        c3.metric("Cached Queries", tavily_stats["size"])
+
+        prefetcher = get_weather_prefetcher()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Warm Destinations", len(prefetcher.snapshot()))
+        c2.metric("Last Weather Refresh", format_age(time.time() - prefetcher.last_refresh) if prefetcher.last_refresh else "Pending")
+        c3.metric("Consecutive Failures", prefetcher.failures)
+        if prefetcher.last_error:
+            st.warning(f"Last prefetch error: {prefetcher.last_error}")
+
+        store = get_tourism_store()
+        if store:
+            store_stats = store.stats()
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Indexed Destinations", store_stats["destinations"])
+            c2.metric("Full-Text Search", "FTS5" if store_stats["fts"] else "Fallback scan")
+            c3.metric("Last Data Import", format_age(time.time() - store_stats["last_import"]) if store_stats["last_import"] else "Up to date")
+            if st.button("Re-import Tourism Data"):
+                store.sync(force=True)
+                st.rerun()
+
+        snapshot = get_data_snapshot()
+        if snapshot:
+            fresh = [f for f in snapshot["data"] if snapshot_is_fresh(snapshot, f)]
+            st.caption(f"📦 Data snapshot built {format_age(time.time() - snapshot['built_at'])}: {len(fresh)} of {len(snapshot['data'])} files fresh. Run `python build_snapshot.py` after editing the data directory.")
+        else:
+            st.caption("📦 No data snapshot; files are parsed from JSON. Run `python build_snapshot.py` to build one.")
+        css_bytes = len(build_css_bundle(st.session_state.theme).encode("utf-8"))
+        st.caption(f"🎨 Stylesheet: inline, {css_bytes / 1024:.1f} KB minified (theme, layout and chatbot)")
+
+        st.markdown("<h4 style='color: var(--text-primary); font-family: \"Inter\", sans-serif;'>⏱️ Render Telemetry</h4>", unsafe_allow_html=True)
+        perf = get_perf_recorder().stats()
+        st.caption("Fragment rows time widget interactions on fragment-scoped pages; compare them with the Rerun row of the same section.")
+        if perf:
+            st.dataframe(pd.DataFrame([
+                {"Measurement": label, "Samples": p["count"], "p50 (ms)": round(p["p50"] * 1000, 1),
+                 "p95 (ms)": round(p["p95"] * 1000, 1), "Max (ms)": round(p["max"] * 1000, 1)}
+                for label, p in perf.items()
+            ]), use_container_width=True, hide_index=True)
+        if st.button("Reset Render Telemetry"):
+            get_perf_recorder().clear()
+            st.rerun()
+
+        router = get_ai_router()
+        cols = st.columns(len(router.providers) + 1)
+        for col, provider in zip(cols, router.stats().values()):
+            col.metric(f"{provider['label']} Circuit", provider["state"].replace("_", "-").title(),
+                       f"p95 {provider['p95']:.1f}s · {provider['error_rate']:.0%} errors", delta_color="off")
+        cols[-1].metric("Hedged Requests", router.hedges, f"{router.live_calls()} calls in flight", delta_color="off")
+
 # ============================================================
 # NEW PLANNER PAGES (Expanded Trip Planner)
 # ============================================================
@@ -1791,7 +3716,7 @@ def planner_explore():
         with cols[i % 3]:
             st.markdown(f"""
 <div class="premium-card" style="padding: 15px;">
-    <img src="{dest['image']}" style="width:100%; height:180px; object-fit:cover; border-radius:12px; margin-bottom:10px;">
+    {responsive_img(dest['image'], dest['name'], style="width:100%; height:180px; object-fit:cover; border-radius:12px; margin-bottom:10px;")}
     <h3 style='color: var(--text-primary); font-size: 1.3em; margin:10px 0 5px;'>{dest['name']}</h3>
     <p style='color: var(--text-muted); font-size: 0.9em; margin:0 0 10px;'>{dest['region']}</p>
     <p style='color: var(--text-secondary); font-size: 0.95em;'>{dest['description']}</p>
@@ -1959,51 +3884,9 @@ def planner_customs():
 # ============================================================
 # ENHANCED GENERATE TRIP MODULE (with colored button & detailed plan)
 # ============================================================
-def planner_generate():
-    st.markdown("<h2 style='color: var(--text-primary); border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🗓️ Generate Your Personalized Trip</h2>", unsafe_allow_html=True)
-    
-    # Add a subtle animation hint
-    st.markdown("""
-    <div style='text-align: center; margin-bottom: 20px; animation: fadeIn 1s ease-in;'>
-        <span style='background: linear-gradient(45deg, #047857, #10b981); padding: 8px 20px; border-radius: 40px; color: white; font-weight: 600;'>
-            ✨ Click the glowing button below for your ultra‑detailed plan
-        </span>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    with st.form("trip_form_enhanced"):
-        st.markdown("<b style='color:var(--text-primary);'>1. Routine Configurator</b>", unsafe_allow_html=True)
-        with st.expander("Configure Weekly Routine", expanded=False):
-            days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            routine_dict = {}
-            for day in days:
-                routine_dict[day] = st.selectbox(day, ["Busy", "Free"], key=f"planner_day_{day}")
-        
-        st.markdown("<br><b style='color:var(--text-primary);'>2. Trip Details</b>", unsafe_allow_html=True)
-        col1, col2 = st.columns(2)
-        with col1:
-            city = st.text_input("📍 Destination City", "New York", key="planner_city")
-            num_days = st.slider("📅 Trip Duration (Days)", 1, 14, 3, key="planner_days")
-        with col2:
-            mood = st.text_input("🎯 Desired Activity / Theme", "Relaxing walk or fine dining", key="planner_mood")
-            travel_style = st.selectbox("🧳 Travel Style", ["Budget", "Standard", "Luxury"], key="planner_style")
-            budget = st.selectbox("💰 Budget Level", ["Low", "Medium", "High"], key="planner_budget")
-        
-        st.markdown("<br>", unsafe_allow_html=True)
-        # The button is automatically styled by CSS (pulse-glow + gradient)
-        submitted = st.form_submit_button("🚀 GENERATE MY ULTIMATE TRIP PLAN", use_container_width=True)
-    
-    if submitted:
-        routine = ", ".join([f"{k}: {v}" for k, v in routine_dict.items()])
-        
-        client = Groq(api_key=GROQ_KEY)
-        weather, err = get_current_weather(city, WEATHER_KEY)
-        if err: 
-            st.error("Weather Error: Could not retrieve meteorological data.")
-        else:
-            with st.spinner("🤖 Crafting your ultra‑detailed travel blueprint..."):
-                # Ultra‑detailed prompt covering all required aspects
-                enhanced_prompt = f"""
+def build_trip_prompt(city, routine, mood, num_days, travel_style, budget, weather):
+    # Ultra‑detailed prompt covering all required aspects
+    return f"""
 You are the world's most meticulous travel planner. Create an extraordinarily detailed, day-by-day trip plan for {city} based on:
 
 User's weekly routine: {routine}
@@ -2049,85 +3932,151 @@ Your plan MUST include the following sections, each with a clear, colored headin
 - Useful local phrases.
 
 Format everything with bullet points, tables, and clear section breaks. Make it feel like a luxury travel consultant prepared it just for them.
-                """
-                
-                # Search Tavily for additional real‑time info
-                search_query = f"tourist attractions safety tips emergency numbers scams in {city}"
-                search_data = search_tavily(search_query)
-                
-                final_res = client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": "You are a premium travel planner. Always respond in beautifully formatted markdown with colored headings."},
-                        {"role": "user", "content": enhanced_prompt + f"\n\nAdditional real‑time web data:\n{search_data}"}
-                    ],
-                    model="llama-3.3-70b-versatile"
-                )
-                plan = final_res.choices[0].message.content
-                
-                # Post‑process to add our custom CSS classes for colored headings
-                # (The AI already includes emoji headings, but we'll ensure they match our CSS)
-                plan = plan.replace("🆘 **EMERGENCY PREPAREDNESS**", "<div class='plan-heading-emergency'>🆘 EMERGENCY PREPAREDNESS</div>")
-                plan = plan.replace("👔 **CLOTHING & PACKING GUIDE**", "<div class='plan-heading-clothing'>👔 CLOTHING & PACKING GUIDE</div>")
-                plan = plan.replace("⏰ **DAILY ITINERARY (Hour by Hour)**", "<div class='plan-heading-schedule'>⏰ DAILY ITINERARY (Hour by Hour)</div>")
-                plan = plan.replace("🧘 **LOCAL CULTURE & BEHAVIOR**", "<div class='plan-heading-behavior'>🧘 LOCAL CULTURE & BEHAVIOR</div>")
-                plan = plan.replace("⚠️ **COMMON SCAMS & HOW TO AVOID THEM**", "<div class='plan-heading-scams'>⚠️ COMMON SCAMS & HOW TO AVOID THEM</div>")
-                plan = plan.replace("💡 **PRACTICAL TIPS**", "<div class='plan-heading-tips'>💡 PRACTICAL TIPS</div>")
-                
-                # Display plan with fade‑in animation
-                st.markdown(f"<div class='fade-in-card'>{plan}</div>", unsafe_allow_html=True)
+"""
+
+def format_plan_headings(plan):
+    # Post‑process to add our custom CSS classes for colored headings
+    # (The AI already includes emoji headings, but we'll ensure they match our CSS)
+    plan = plan.replace("🆘 **EMERGENCY PREPAREDNESS**", "<div class='plan-heading-emergency'>🆘 EMERGENCY PREPAREDNESS</div>")
+    plan = plan.replace("👔 **CLOTHING & PACKING GUIDE**", "<div class='plan-heading-clothing'>👔 CLOTHING & PACKING GUIDE</div>")
+    plan = plan.replace("⏰ **DAILY ITINERARY (Hour by Hour)**", "<div class='plan-heading-schedule'>⏰ DAILY ITINERARY (Hour by Hour)</div>")
+    plan = plan.replace("🧘 **LOCAL CULTURE & BEHAVIOR**", "<div class='plan-heading-behavior'>🧘 LOCAL CULTURE & BEHAVIOR</div>")
+    plan = plan.replace("⚠️ **COMMON SCAMS & HOW TO AVOID THEM**", "<div class='plan-heading-scams'>⚠️ COMMON SCAMS & HOW TO AVOID THEM</div>")
+    plan = plan.replace("💡 **PRACTICAL TIPS**", "<div class='plan-heading-tips'>💡 PRACTICAL TIPS</div>")
+    return plan
+
+def render_forecast_charts(df, city):
+    # Enhanced weather forecast with dual charts
+    st.divider()
+    st.markdown(f"<h3 style='color:var(--text-primary);'>🌦️ 5‑Day Detailed Forecast for {city.title()}</h3>", unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    template = "plotly_dark" if st.session_state.theme == "dark" else "plotly"
+    # The forecast frame's content is its data version; the same city re-renders from cache
+    version = hashlib.sha256(df.to_json().encode("utf-8")).hexdigest()
+    city_key = " ".join(city.lower().split())
+    
+    def build_temp():
+        # Temperature line with markers
+        fig_temp = px.line(df, x="Datetime", y="Temperature (°C)", 
+                          title="<b>Temperature Trend</b>", 
+                          markers=True, 
+                          template=template,
+                          color_discrete_sequence=["#e11d48"])
+        fig_temp.update_layout(hovermode="x unified")
+        return fig_temp
+
+    def build_rain():
+        # Rain chance bar chart
+        fig_rain = px.bar(df, x="Datetime", y="Rain Chance (%)", 
+                         title="<b>Rain Probability</b>", 
+                         range_y=[0, 100],
+                         template=template,
+                         color_discrete_sequence=["#2563eb"])
+        fig_rain.update_layout(hovermode="x unified")
+        return fig_rain
+
+    with col1:
+        plotly_cached("forecast_temperature", version, city_key, build_temp)
+    
+    with col2:
+        plotly_cached("forecast_rain", version, city_key, build_rain)
+    
+    # Additional humidity/wind if available
+    if "humidity" in df.columns or "wind_speed" in df.columns:
+        st.markdown("#### Additional Metrics")
+        cols = st.columns(2)
+        if "humidity" in df.columns:
+            with cols[0]:
+                plotly_cached("forecast_humidity", version, city_key,
+                              lambda: px.line(df, x="Datetime", y="humidity", title="Humidity (%)", template=template))
+        if "wind_speed" in df.columns:
+            with cols[1]:
+                plotly_cached("forecast_wind", version, city_key,
+                              lambda: px.line(df, x="Datetime", y="wind_speed", title="Wind Speed (m/s)", template=template))
+
+def planner_generate():
+    st.markdown("<h2 style='color: var(--text-primary); border-bottom: 2px solid var(--border-color); padding-bottom: 10px;'>🗓️ Generate Your Personalized Trip</h2>", unsafe_allow_html=True)
+    
+    # Add a subtle animation hint
+    st.markdown("""
+    <div style='text-align: center; margin-bottom: 20px; animation: fadeIn 1s ease-in;'>
+        <span style='background: linear-gradient(45deg, #047857, #10b981); padding: 8px 20px; border-radius: 40px; color: white; font-weight: 600;'>
+            ✨ Click the glowing button below for your ultra‑detailed plan
+        </span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    with st.form("trip_form_enhanced"):
+        st.markdown("<b style='color:var(--text-primary);'>1. Routine Configurator</b>", unsafe_allow_html=True)
+        with st.expander("Configure Weekly Routine", expanded=False):
+            days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+            routine_dict = {}
+            for day in days:
+                routine_dict[day] = st.selectbox(day, ["Busy", "Free"], key=f"planner_day_{day}")
+        
+        st.markdown("<br><b style='color:var(--text-primary);'>2. Trip Details</b>", unsafe_allow_html=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            city = st.text_input("📍 Destination City", "New York", key="planner_city")
+            num_days = st.slider("📅 Trip Duration (Days)", 1, 14, 3, key="planner_days")
+        with col2:
+            mood = st.text_input("🎯 Desired Activity / Theme", "Relaxing walk or fine dining", key="planner_mood")
+            travel_style = st.selectbox("🧳 Travel Style", ["Budget", "Standard", "Luxury"], key="planner_style")
+            budget = st.selectbox("💰 Budget Level", ["Low", "Medium", "High"], key="planner_budget")
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+        # The button is automatically styled by CSS (pulse-glow + gradient)
+        submitted = st.form_submit_button("🚀 GENERATE MY ULTIMATE TRIP PLAN", use_container_width=True)
+    
+    if submitted:
+        routine = ", ".join([f"{k}: {v}" for k, v in routine_dict.items()])
+        
+        # Weather (current + forecast in one call) and web search only depend on the city, so fetch them together
+        weather_job = run_in_background(get_city_weather, city, WEATHER_KEY)
+        search_job = run_in_background(search_tavily, f"tourist attractions safety tips emergency numbers scams in {city}")
+        
+        weather, df = weather_job.result()
+        if weather is None: 
+            st.error("Weather Error: Could not retrieve meteorological data.")
+        else:
+            plan_slot = st.container()
+            with plan_slot:
+                plan_status = st.empty()
+                plan_status.info("🤖 Crafting your ultra‑detailed travel blueprint...")
+            
+            enhanced_prompt = build_trip_prompt(city, routine, mood, num_days, travel_style, budget, weather)
+            search_data = search_job.result()
+            plan_stream = prefetch_stream(stream_ai_response(
+                [
+                    {"role": "system", "content": "You are a premium travel planner. Always respond in beautifully formatted markdown with colored headings."},
+                    {"role": "user", "content": enhanced_prompt + f"\n\nAdditional real‑time web data:\n{search_data}"}
+                ],
+                model="llama-3.3-70b-versatile"
+            ))
+            
+            # Forecast charts render below the plan slot while the LLM is still generating
+            if df is not None:
+                render_forecast_charts(df, city)
+            
+            with plan_slot:
+                # Stream the plan with fade‑in animation, headings styled as they complete
+                plan = format_plan_headings(render_ai_stream(
+                    plan_stream,
+                    transform=lambda text: f"<div class='fade-in-card'>{format_plan_headings(text)}</div>",
+                    placeholder=plan_status,
+                    html=True
+                ))
                 
                 # Download button
                 st.download_button("📥 Download This Ultimate Plan (PDF)", create_pdf(plan), "ultimate_trip_plan.pdf")
-                
-                # Enhanced weather forecast with dual charts
-                df = get_forecast(city, WEATHER_KEY)
-                if df is not None:
-                    st.divider()
-                    st.markdown(f"<h3 style='color:var(--text-primary);'>🌦️ 5‑Day Detailed Forecast for {city.title()}</h3>", unsafe_allow_html=True)
-                    
-                    col1, col2 = st.columns(2)
-                    template = "plotly_dark" if st.session_state.theme == "dark" else "plotly"
-                    
-                    with col1:
-                        # Temperature line with markers
-                        fig_temp = px.line(df, x="Datetime", y="Temperature (°C)", 
-                                          title="<b>Temperature Trend</b>", 
-                                          markers=True, 
-                                          template=template,
-                                          color_discrete_sequence=["#e11d48"])
-                        fig_temp.update_layout(hovermode="x unified")
-                        st.plotly_chart(fig_temp, use_container_width=True)
-                    
-                    with col2:
-                        # Rain chance bar chart
-                        fig_rain = px.bar(df, x="Datetime", y="Rain Chance (%)", 
-                                         title="<b>Rain Probability</b>", 
-                                         range_y=[0, 100],
-                                         template=template,
-                                         color_discrete_sequence=["#2563eb"])
-                        fig_rain.update_layout(hovermode="x unified")
-                        st.plotly_chart(fig_rain, use_container_width=True)
-                    
-                    # Additional humidity/wind if available
-                    if "humidity" in df.columns or "wind_speed" in df.columns:
-                        st.markdown("#### Additional Metrics")
-                        cols = st.columns(2)
-                        if "humidity" in df.columns:
-                            with cols[0]:
-                                fig_hum = px.line(df, x="Datetime", y="humidity", title="Humidity (%)", template=template)
-                                st.plotly_chart(fig_hum, use_container_width=True)
-                        if "wind_speed" in df.columns:
-                            with cols[1]:
-                                fig_wind = px.line(df, x="Datetime", y="wind_speed", title="Wind Speed (m/s)", template=template)
-                                st.plotly_chart(fig_wind, use_container_width=True)
     else:
         st.info("👈 Fill in your routine and preferences, then click the glowing button for your ultimate trip plan.")
 
 # ============================================================
 # NEW WELCOME TAB (premium animated intro)
 # ============================================================
-def tab_welcome():
-    st.markdown("""
+welcome_css = """
     <style>
         @keyframes slideInFromLeft {
             0% { opacity: 0; transform: translateX(-50px); }
@@ -2220,7 +4169,10 @@ def tab_welcome():
             .welcome-card { min-width: 100%; }
         }
     </style>
+"""
 
+def tab_welcome():
+    st.markdown("""
     <div style='text-align:center; padding: 40px 20px;'>
         <h1 class='welcome-title'><span>Welcome</span></h1>
         <p class='welcome-subtitle'>
@@ -2249,12 +4201,117 @@ def tab_welcome():
     </div>
     """, unsafe_allow_html=True)
 
+# ============================================================
+# MESHU CHATBOT CSS (part of the theme bundle)
+# ============================================================
+meshu_css = """
+    <style>
+        /* JUMPING ANIMATION */
+        @keyframes meshuJump {
+            0%, 100% { transform: translateY(0); }
+            40% { transform: translateY(-18px); }
+            60% { transform: translateY(-10px); }
+            80% { transform: translateY(-18px); }
+        }
+        
+        @keyframes typing { 0%, 100% { opacity: .2; } 20% { opacity: 1; } }
+        @keyframes pulseRed { 0% { box-shadow: 0 0 0 0 rgba(239,68,68,0.7); } 70% { box-shadow: 0 0 0 10px rgba(239,68,68,0); } 100% { box-shadow: 0 0 0 0 rgba(239,68,68,0); } }
+        
+        #meshu-toggle-btn {
+            width: 65px; height: 65px; border-radius: 50%;
+            background: white; border: 2px solid #2563eb;
+            cursor: pointer; box-shadow: 0 10px 30px rgba(0,0,0,0.3);
+            display: flex; align-items: center; justify-content: center;
+            overflow: hidden; transition: 0.3s;
+            animation: meshuJump 2.5s infinite cubic-bezier(0.28, 0.84, 0.42, 1);
+        }
+        #meshu-toggle-btn img { width: 85%; height: 85%; transform-origin: bottom center; }
+
+        #meshu-window {
+            display: none; 
+            width: 380px; 
+            max-width: calc(100vw - 40px);
+            height: 520px;
+            max-height: calc(100vh - 200px);
+            background: rgba(15, 23, 42, 0.98); backdrop-filter: blur(15px);
+            border-radius: 20px; box-shadow: 0 25px 50px -12px rgba(0, 0, 0, 0.5);
+            position: absolute; bottom: 80px; right: 0;
+            flex-direction: column; border: 1px solid rgba(255, 255, 255, 0.1);
+            font-family: 'Inter', sans-serif; overflow: hidden;
+        }
+
+        .meshu-header { padding: 15px 20px; background: #0f172a; border-bottom: 1px solid rgba(255,255,255,0.05); }
+        .meshu-header h3 { margin: 0; font-size: 16px; color: white; }
+        .meshu-header p { margin: 4px 0 0; font-size: 12px; color: #94a3b8; line-height: 1.3; }
+
+        .meshu-messages { flex: 1; padding: 15px; overflow-y: auto; display: flex; flex-direction: column; gap: 10px; scroll-behavior: smooth; }
+        
+        .meshu-msg { 
+            max-width: 85%; padding: 12px 16px; border-radius: 18px; 
+            font-size: 14px; line-height: 1.5; color: #f1f5f9; word-wrap: break-word;
+        }
+        .meshu-user { align-self: flex-end; background: #2563eb; border-bottom-right-radius: 4px; }
+        .meshu-ai { align-self: flex-start; background: #1e293b; border-bottom-left-radius: 4px; border: 1px solid rgba(255,255,255,0.05); }
+        
+        .quick-chips { display: flex; flex-wrap: wrap; gap: 6px; padding: 10px 15px; background: transparent; border-top: 1px solid rgba(255,255,255,0.05); }
+        .chip { 
+            background: rgba(37, 99, 235, 0.1); border: 1px solid #2563eb; 
+            color: #60a5fa; padding: 6px 12px; border-radius: 16px; 
+            font-size: 12px; cursor: pointer; transition: 0.2s; white-space: nowrap;
+        }
+        .chip:hover { background: #2563eb; color: white; }
+
+        .meshu-input-area { padding: 10px 15px; display: flex; gap: 8px; background: #0f172a; }
+        #meshu-mic {
+            background: #334155; border: none; padding: 0 12px; 
+            border-radius: 12px; color: white; cursor: pointer; transition: 0.2s; font-size: 12px; font-weight: bold;
+        }
+        #meshu-mic:hover { background: #475569; }
+        #meshu-mic.recording { background: #ef4444; animation: pulseRed 1.5s infinite; }
+
+        .meshu-input-area input { 
+            flex: 1; padding: 10px 15px; border-radius: 12px; border: 1px solid #334155;
+            background: #1e293b; color: white; outline: none; font-family: 'Inter', sans-serif; font-size: 14px;
+        }
+        .meshu-input-area button.send-btn { 
+            background: #2563eb; border: none; padding: 0 16px; 
+            border-radius: 12px; color: white; font-weight: 600; cursor: pointer;
+            font-family: 'Inter', sans-serif; transition: 0.2s; font-size: 14px;
+        }
+        .meshu-input-area button.send-btn:hover { background: #1d4ed8; }
+        
+        .typing-dot { display: inline-block; width: 6px; height: 6px; border-radius: 50%; background: #94a3b8; margin-right: 3px; animation: typing 1.4s infinite both; }
+        .typing-dot:nth-child(2) { animation-delay: .2s; }
+        .typing-dot:nth-child(3) { animation-delay: .4s; margin-right: 0; }
+    </style>
+"""
+
+# ============================================================
+# CSS BUNDLE (minified per theme, inlined into the page)
+# ============================================================
+def minify_css(css):
+    """Strip <style> tags, @imports and comments, and collapse whitespace. Space before ':' is kept (descendant pseudo-classes)."""
+    css = re.sub(r"</?style>|@import\s+url\([^)]*\)\s*;|/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css).replace(": ", ":")
+    return css.replace(";}", "}").strip()
+
+@st.cache_resource
+def build_css_bundle(theme):
+    """The theme's stylesheet, MESHU chatbot styles included, minified once per theme per process."""
+    return minify_css(get_theme_css(theme) + base_css + welcome_css + meshu_css)
+
+def apply_theme_css(theme):
+    """Inline the theme's bundle as a single <style>. Streamlit keeps an element mounted while
+    each rerun emits it unchanged, so the styles never drop out or flash between reruns, and
+    no iframe or fetch is involved; switching theme swaps the content in place."""
+    st.markdown(f"<style>@import url('{FONTS_CSS_URL}');{build_css_bundle(theme)}</style>", unsafe_allow_html=True)
+
 # ============================================================
 # MAIN APP LAYOUT with Theme Toggle
 # ============================================================
-# Apply theme CSS
-st.markdown(get_theme_css(st.session_state.theme), unsafe_allow_html=True)
-st.markdown(base_css, unsafe_allow_html=True)
+# Apply theme CSS (one cached, minified stylesheet per theme)
+apply_theme_css(st.session_state.theme)
 
 # Header with title and theme toggle
 header_col1, header_col2, header_col3 = st.columns([4, 6, 2])
@@ -2265,20 +4322,23 @@ with header_col3:
         toggle_theme()
         st.rerun()
 
-# Tabs – WELCOME TAB ADDED AS THE FIRST TAB
-welcome_tab, main_tab, companion_tab, tourism_tab = st.tabs([
-    "👋 Welcome", 
-    "📅 Trip Planner", 
-    "🤖 Health Companion", 
-    "🇵🇰 Pakistan Tourism"
-])
+# Section navigation – unlike st.tabs, only the selected section executes on each rerun
+active_section = st.radio(
+    "Sections",
+    APP_SECTIONS,
+    index=APP_SECTIONS.index(st.session_state.active_section),
+    key="section_nav",
+    horizontal=True,
+    label_visibility="collapsed",
+    on_change=update_active_section
+)
 
 # --- TAB 0: WELCOME ---
-with welcome_tab:
+if active_section == "👋 Welcome":
     tab_welcome()
 
 # --- TAB 1: EXPANDED TRIP PLANNER ---
-with main_tab:
+elif active_section == "📅 Trip Planner":
     planner_sidebar_col, planner_content_col = st.columns([2.5, 7.5])
     
     with planner_sidebar_col:
@@ -2314,7 +4374,7 @@ with main_tab:
         planner_modules[selected]()
 
 # --- TAB 2: HEALTH COMPANION (enhanced with questionnaire) ---
-with companion_tab:
+elif active_section == "🤖 Health Companion":
     # Initialize state variables for the questionnaire if not already set
     if "disease_info" not in st.session_state:
         st.session_state.disease_info = None
@@ -2378,15 +4438,19 @@ with companion_tab:
     # --- Handle voice input (unchanged) ---
     if audio_val and audio_val != st.session_state.last_audio:
         st.session_state.last_audio = audio_val
-        groq_client = Groq(api_key=GROQ_KEY)
-        txt = groq_client.audio.transcriptions.create(file=("v.wav", audio_val), model="whisper-large-v3-turbo").text
+        txt = get_groq_client().audio.transcriptions.create(file=("v.wav", audio_val), model="whisper-large-v3-turbo").text
         
         sys_prompt = "You are a friendly AI companion. Reply in the exact same language as the user. YOU MUST start your response with exactly [LANG:UR] for Urdu, [LANG:HI] for Hindi, or [LANG:EN] for English. Always use emojis."
         messages = [
             {"role": "system", "content": sys_prompt},
             {"role": "user", "content": txt}
         ]
-        response, source = get_ai_response(messages, model="llama-3.3-70b-versatile")
+        st.chat_message("user").write(f"🎙️ {txt}")
+        with st.chat_message("assistant"):
+            response = render_ai_stream(
+                stream_ai_response(messages, model="llama-3.3-70b-versatile", use_cache=LLM_CACHE_HEALTH),
+                transform=lambda t: t.replace("[LANG:UR]", "").replace("[LANG:HI]", "").replace("[LANG:EN]", "")
+            )
         
         # Parse language tag
         lang = "UR" if "[LANG:UR]" in response else "HI" if "[LANG:HI]" in response else "EN"
@@ -2402,6 +4466,7 @@ with companion_tab:
     # --- Handle text input (the core questionnaire) ---
     if prompt := st.chat_input("Message..."):
         st.session_state.chat_history.append({"role": "user", "content": prompt})
+        st.chat_message("user").write(prompt)
 
         # Determine next step based on state
         if not st.session_state.disease_asked:
@@ -2439,7 +4504,8 @@ Format the plan in a clear, easy-to-read manner with headings and bullet points.
 """
             messages = [{"role": "system", "content": "You are a helpful nutritionist."},
                         {"role": "user", "content": diet_prompt}]
-            response, source = get_ai_response(messages)
+            with st.chat_message("assistant"):
+                response = render_ai_stream(stream_ai_response(messages, use_cache=LLM_CACHE_HEALTH))
             st.session_state.chat_history.append({"role": "assistant", "content": response})
             st.session_state.diet_generated = True
             st.session_state.chat_history.append({"role": "assistant", "content": "Would you like to share your daily routine so I can refine the diet plan further? (Reply with your routine or say 'no thanks')"})
@@ -2454,7 +4520,8 @@ Based on the user's routine: {prompt}, refine the previously given diet plan to
 """
                 messages = [{"role": "system", "content": "You are a helpful nutritionist."},
                             {"role": "user", "content": refine_prompt}]
-                response, source = get_ai_response(messages)
+                with st.chat_message("assistant"):
+                    response = render_ai_stream(stream_ai_response(messages, use_cache=LLM_CACHE_HEALTH))
                 st.session_state.chat_history.append({"role": "assistant", "content": response})
 
         else:
@@ -2464,7 +4531,8 @@ Based on the user's routine: {prompt}, refine the previously given diet plan to
                 {"role": "system", "content": f"Helpful AI. Use emojis. Ask 'What else can I do for you today?'. {ctx}"},
                 {"role": "user", "content": prompt}
             ]
-            response, source = get_ai_response(messages, model="llama-3.3-70b-versatile")
+            with st.chat_message("assistant"):
+                response = render_ai_stream(stream_ai_response(messages, model="llama-3.3-70b-versatile", use_cache=LLM_CACHE_HEALTH))
             st.session_state.chat_history.append({"role": "assistant", "content": response})
 
         st.rerun()
@@ -2475,7 +4543,7 @@ Based on the user's routine: {prompt}, refine the previously given diet plan to
         st.rerun()
 
 # --- TAB 3: PAKISTAN TOURISM (unchanged) ---
-with tourism_tab:
+elif active_section == "🇵🇰 Pakistan Tourism":
     header_col, toggle_col = st.columns([8.5, 1.5])
     with header_col:
         st.markdown("<h3 style='color:var(--text-primary); font-weight:800;'>🇵🇰 Pakistan Tourism Hub</h3>", unsafe_allow_html=True)
@@ -2550,7 +4618,7 @@ def add_meshu_chatbot():
     except Exception:
         bot_avatar = "https://cdn-icons-png.flaticon.com/512/4712/4712035.png"
 
-    # 3. Chatbot HTML/CSS/JS Injection
+    # 3. Chatbot HTML/JS Injection (its styles ship in the theme CSS bundle)
     chatbot_html = f"""
     <div id="meshu-chatbot-placeholder"></div>
 
@@ -2561,91 +4629,6 @@ def add_meshu_chatbot():
         
         if (doc.getElementById(containerId)) return;
 
-        // --- PREMIUM, RESPONSIVE & ANIMATION CSS STYLES ---
-        const style = doc.createElement('style');
-        style.textContent = `
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-            
-            /* JUMPING ANIMATION */
-            @keyframes meshuJump {{
-                0%, 100% {{ transform: translateY(0); }}
-                40% {{ transform: translateY(-18px); }}
-                60% {{ transform: translateY(-10px); }}
-                80% {{ transform: translateY(-18px); }}
-            }}
-            
-            @keyframes typing {{ 0%, 100% {{ opacity: .2; }} 20% {{ opacity: 1; }} }}
-            @keyframes pulseRed {{ 0% {{ box-shadow: 0 0 0 0 rgba(239,68,68,0.7); }} 70% {{ box-shadow: 0 0 0 10px rgba(239,68,68,0); }} 100% {{ box-shadow: 0 0 0 0 rgba(239,68,68,0); }} }}
-            
-            #meshu-toggle-btn {{
-                width: 65px; height: 65px; border-radius: 50%;
-                background: white; border: 2px solid #2563eb;
-                cursor: pointer; box-shadow: 0 10px 30px rgba(0,0,0,0.3);
-                display: flex; align-items: center; justify-content: center;
-                overflow: hidden; transition: 0.3s;
-                animation: meshuJump 2.5s infinite cubic-bezier(0.28, 0.84, 0.42, 1);
-            }}
-            #meshu-toggle-btn img {{ width: 85%; height: 85%; transform-origin: bottom center; }}
-
-            #meshu-window {{
-                display: none; 
-                width: 380px; 
-                max-width: calc(100vw - 40px);
-                height: 520px;
-                max-height: calc(100vh - 200px);
-                background: rgba(15, 23, 42, 0.98); backdrop-filter: blur(15px);
-                border-radius: 20px; box-shadow: 0 25px 50px -12px rgba(0, 0, 0, 0.5);
-                position: absolute; bottom: 80px; right: 0;
-                flex-direction: column; border: 1px solid rgba(255, 255, 255, 0.1);
-                font-family: 'Inter', sans-serif; overflow: hidden;
-            }}
-
-            .meshu-header {{ padding: 15px 20px; background: #0f172a; border-bottom: 1px solid rgba(255,255,255,0.05); }}
-            .meshu-header h3 {{ margin: 0; font-size: 16px; color: white; }}
-            .meshu-header p {{ margin: 4px 0 0; font-size: 12px; color: #94a3b8; line-height: 1.3; }}
-
-            .meshu-messages {{ flex: 1; padding: 15px; overflow-y: auto; display: flex; flex-direction: column; gap: 10px; scroll-behavior: smooth; }}
-            
-            .meshu-msg {{ 
-                max-width: 85%; padding: 12px 16px; border-radius: 18px; 
-                font-size: 14px; line-height: 1.5; color: #f1f5f9; word-wrap: break-word;
-            }}
-            .meshu-user {{ align-self: flex-end; background: #2563eb; border-bottom-right-radius: 4px; }}
-            .meshu-ai {{ align-self: flex-start; background: #1e293b; border-bottom-left-radius: 4px; border: 1px solid rgba(255,255,255,0.05); }}
-            
-            .quick-chips {{ display: flex; flex-wrap: wrap; gap: 6px; padding: 10px 15px; background: transparent; border-top: 1px solid rgba(255,255,255,0.05); }}
-            .chip {{ 
-                background: rgba(37, 99, 235, 0.1); border: 1px solid #2563eb; 
-                color: #60a5fa; padding: 6px 12px; border-radius: 16px; 
-                font-size: 12px; cursor: pointer; transition: 0.2s; white-space: nowrap;
-            }}
-            .chip:hover {{ background: #2563eb; color: white; }}
-
-            .meshu-input-area {{ padding: 10px 15px; display: flex; gap: 8px; background: #0f172a; }}
-            #meshu-mic {{
-                background: #334155; border: none; padding: 0 12px; 
-                border-radius: 12px; color: white; cursor: pointer; transition: 0.2s; font-size: 12px; font-weight: bold;
-            }}
-            #meshu-mic:hover {{ background: #475569; }}
-            #meshu-mic.recording {{ background: #ef4444; animation: pulseRed 1.5s infinite; }}
-
-            .meshu-input-area input {{ 
-                flex: 1; padding: 10px 15px; border-radius: 12px; border: 1px solid #334155;
-                background: #1e293b; color: white; outline: none; font-family: 'Inter', sans-serif; font-size: 14px;
-            }}
-            .meshu-input-area button.send-btn {{ 
-                background: #2563eb; border: none; padding: 0 16px; 
-                border-radius: 12px; color: white; font-weight: 600; cursor: pointer;
-                font-family: 'Inter', sans-serif; transition: 0.2s; font-size: 14px;
-            }}
-            .meshu-input-area button.send-btn:hover {{ background: #1d4ed8; }}
-            
-            .typing-dot {{ display: inline-block; width: 6px; height: 6px; border-radius: 50%; background: #94a3b8; margin-right: 3px; animation: typing 1.4s infinite both; }}
-            .typing-dot:nth-child(2) {{ animation-delay: .2s; }}
-            .typing-dot:nth-child(3) {{ animation-delay: .4s; margin-right: 0; }}
-        `;
-        doc.head.appendChild(style);
-
         // --- HTML STRUCTURE ---
         const container = doc.createElement('div');
         container.id = containerId;
@@ -2871,3 +4854,6 @@ def add_meshu_chatbot():
     components.html(chatbot_html, height=0)
 
 add_meshu_chatbot()
+
+# Wall time of this rerun, attributed to the section that ran (admin console → Render Telemetry)
+get_perf_recorder().record(f"Rerun · {active_section}", time.perf_counter() - RERUN_STARTED)
@@ -0,0 +1,194 @@
+"""
+Build step for the tourism data directory.
+
+Validates data/destinations.json, data/budget_templates.json and
+data/emergency_contacts.json against a small schema, then writes
+data/snapshot.pickle: the parsed structures plus the mtime and size of every
+source file. app.py loads the snapshot once per process and serves a file
+from it only while that file's mtime and size still match, so a stale
+snapshot silently falls back to JSON.
+
+    python build_snapshot.py            # validate and write the snapshot
+    python build_snapshot.py --check    # validate only
+    python build_snapshot.py --bench    # compare JSON parsing with snapshot loading
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "snapshot.pickle")
+SNAPSHOT_FORMAT = 1
+SOURCES = ("destinations.json", "budget_templates.json", "emergency_contacts.json")
+
+NUMBER = (int, float)
+
+# Minimal structural schema: {"type": ..., "required": {...}, "optional": {...}, "items": ..., "values": ..., "enum": ...}
+SCHEMA = {
+    "destinations.json": {
+        "type": list,
+        "items": {
+            "type": dict,
+            "required": {"name": {"type": str}},
+            "optional": {
+                "region": {"type": str},
+                "access_level": {"type": str, "enum": ("Easy", "Moderate", "Difficult")},
+                "latitude": {"type": NUMBER, "range": (-90, 90)},
+                "longitude": {"type": NUMBER, "range": (-180, 180)},
+                "altitude_m": {"type": NUMBER},
+                "best_season": {"type": str},
+                "budget_per_day": {"type": dict, "values": {"type": NUMBER}},
+                "description": {"type": str},
+                "history": {"type": str},
+                "landmarks": {"type": list, "items": {"type": dict, "required": {"name": {"type": str}}}},
+                "activities": {"type": list, "items": {"type": str}},
+                "gallery_images": {"type": list, "items": {"type": str}},
+            },
+        },
+    },
+    "budget_templates.json": {
+        "type": dict,
+        "required": {
+            "categories": {
+                "type": list,
+                "items": {
+                    "type": dict,
+                    "required": {"name": {"type": str}, "budget": {"type": NUMBER}, "standard": {"type": NUMBER}, "luxury": {"type": NUMBER}},
+                },
+            },
+        },
+        "optional": {
+            "travel_styles": {"type": list, "items": {"type": str}},
+            "currency_rates": {"type": dict, "values": {"type": NUMBER}},
+            "tips": {"type": list, "items": {"type": str}},
+        },
+    },
+    "emergency_contacts.json": {
+        "type": dict,
+        "optional": {
+            "national": {"type": list, "items": {"type": dict, "required": {"service": {"type": str}, "number": {"type": str}}}},
+            "regional": {
+                "type": dict,
+                "values": {
+                    "type": dict,
+                    "optional": {
+                        "hospitals": {"type": list, "items": {"type": dict, "required": {"name": {"type": str}, "city": {"type": str}}}},
+                    },
+                },
+            },
+            "embassies": {"type": list, "items": {"type": dict, "required": {"country": {"type": str}, "city": {"type": str}}}},
+        },
+    },
+}
+
+def validate(value, schema, path="$"):
+    """Return a list of human-readable schema violations (empty when valid)."""
+    errors = []
+    if not isinstance(value, schema["type"]) or isinstance(value, bool) and schema["type"] is not bool:
+        expected = schema["type"].__name__ if isinstance(schema["type"], type) else "number"
+        return [f"{path}: expected {expected}, got {type(value).__name__}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {', '.join(schema['enum'])}")
+    if "range" in schema and not schema["range"][0] <= value <= schema["range"][1]:
+        errors.append(f"{path}: {value} is outside {schema['range']}")
+    if isinstance(value, dict):
+        for key, sub in schema.get("required", {}).items():
+            if key not in value:
+                errors.append(f"{path}: missing required key '{key}'")
+            else:
+                errors += validate(value[key], sub, f"{path}.{key}")
+        for key, sub in schema.get("optional", {}).items():
+            if key in value:
+                errors += validate(value[key], sub, f"{path}.{key}")
+        if "values" in schema:
+            for key, item in value.items():
+                errors += validate(item, schema["values"], f"{path}.{key}")
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors += validate(item, schema["items"], f"{path}[{i}]")
+    if schema is SCHEMA["destinations.json"]:
+        names = [d.get("name") for d in value if isinstance(d, dict)]
+        errors += [f"{path}: duplicate destination '{n}'" for n in sorted(set(n for n in names if names.count(n) > 1))]
+    return errors
+
+def load_sources(data_dir):
+    """{filename: (parsed data, (mtime_ns, size))} for every source present in data_dir."""
+    sources = {}
+    for filename in SOURCES:
+        path = os.path.join(data_dir, filename)
+        if not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        with open(path, "r", encoding="utf-8") as f:
+            sources[filename] = (json.load(f), (stat.st_mtime_ns, stat.st_size))
+    return sources
+
+def write_snapshot(sources, path):
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "built_at": time.time(),
+        "sources": {filename: stamp for filename, (_, stamp) in sources.items()},
+        "data": {filename: data for filename, (data, _) in sources.items()},
+    }
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+def bench(data_dir, path, rounds):
+    def parse_json():
+        for filename in SOURCES:
+            try:
+                with open(os.path.join(data_dir, filename), "r", encoding="utf-8") as f:
+                    json.load(f)
+            except FileNotFoundError:
+                pass
+
+    def load_snapshot():
+        with open(path, "rb") as f:
+            pickle.load(f)
+
+    for label, fn in (("JSON parse", parse_json), ("Snapshot load", load_snapshot)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        print(f"{label:<14} {(time.perf_counter() - start) / rounds * 1000:8.3f} ms per cold load ({rounds} rounds)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the data directory and build its binary snapshot.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--check", action="store_true", help="validate only, don't write the snapshot")
+    parser.add_argument("--bench", action="store_true", help="time JSON parsing against snapshot loading")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    sources = load_sources(args.data_dir)
+    if not sources:
+        print(f"No data files found in {args.data_dir}; the app will use its built-in fallbacks.")
+        return 0
+    errors = []
+    for filename, (data, _) in sources.items():
+        errors += [f"{filename} {e}" for e in validate(data, SCHEMA[filename])]
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        return 1
+    print(f"Validated {', '.join(sources)}")
+    if args.check:
+        return 0
+
+    path = os.path.join(args.data_dir, os.path.basename(SNAPSHOT_PATH))
+    size = write_snapshot(sources, path)
+    print(f"Wrote {path} ({size / 1024:.1f} KB)")
+    if args.bench:
+        bench(args.data_dir, path, args.rounds)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Local stand-ins for the third-party HTTP services the app calls, for
+offline development and tests. Each stub is a small threaded HTTP server
+with deterministic responses.
+
+    python stub_servers.py rates [--port 8765]
+    python stub_servers.py tiles [--port 8767]
+
+Then point the app at it in .streamlit/secrets.toml:
+
+    fx_rates_url = "http://127.0.0.1:8765/v6/latest/PKR"
+
+The tile stub stands in for the CARTO/OSM upstream of tile_proxy.py:
+
+    python tile_proxy.py serve --upstream voyager=http://127.0.0.1:8767/{z}/{x}/{y}.png
+"""
+import argparse
+import json
+import struct
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# PKR -> currency, roughly current; deterministic so tests can assert on conversions
+STUB_RATES = {
+    "USD": 0.00357, "EUR": 0.00329, "GBP": 0.00281, "AED": 0.01311, "CNY": 0.02583,
+    "SAR": 0.01339, "JPY": 0.5412, "CAD": 0.00489, "AUD": 0.00543, "INR": 0.2985,
+}
+
+class RatesHandler(BaseHTTPRequestHandler):
+    """Answers /v6/latest/<BASE> in the open.er-api response shape. Only PKR is supported."""
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) != 3 or parts[:2] != ["v6", "latest"]:
+            return self._send(404, {"result": "error", "error-type": "unsupported-code"})
+        if parts[2].upper() != "PKR":
+            return self._send(400, {"result": "error", "error-type": "unsupported-code"})
+        now = int(time.time())
+        self._send(200, {
+            "result": "success",
+            "base_code": "PKR",
+            "time_last_update_unix": now,
+            "time_next_update_unix": now + 86400,
+            "rates": dict(STUB_RATES, PKR=1),
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        print(f"[{self.server.stub_name}] {self.address_string()} {fmt % args}")
+
+def solid_png(rgb, size=256):
+    """A size x size single-colour PNG, built without imaging libraries."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = (b"\x00" + bytes(rgb) * size) * size
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+class TilesHandler(BaseHTTPRequestHandler):
+    """Answers /<z>/<x>/<y>.png with a solid tile whose colour depends on the coordinates."""
+    def do_GET(self):
+        try:
+            z, x, y = (int(p) for p in self.path.split("?")[0].strip("/").removesuffix(".png").split("/"))
+        except ValueError:
+            return self._send(404, b"not found", "text/plain")
+        if not (0 <= z <= 19 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return self._send(404, b"tile out of range", "text/plain")
+        self._send(200, solid_png(((z * 40) % 256, (x * 13) % 256, (y * 29) % 256)), "image/png")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        print(f"[{self.server.stub_name}] {self.address_string()} {fmt % args}")
+
+STUBS = {
+    "rates": (RatesHandler, 8765),
+    "tiles": (TilesHandler, 8767),
+}
+
+def serve(name, host, port):
+    handler, default_port = STUBS[name]
+    server = ThreadingHTTPServer((host, port or default_port), handler)
+    server.stub_name = name
+    print(f"{name} stub listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub of a third-party service.")
+    parser.add_argument("stub", choices=sorted(STUBS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="defaults to the stub's conventional port")
+    args = parser.parse_args()
+    serve(args.stub, args.host, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Minification of the per-theme stylesheet bundle.
+
+app.py is a Streamlit script, so importing it would run the whole page;
+the CSS sources and minifier are compiled straight out of its source instead.
+"""
+import ast
+import os
+import re
+
+import pytest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+NAMES = {"get_theme_css", "base_css", "welcome_css", "meshu_css", "minify_css"}
+
+def _name(node):
+    if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    return getattr(node, "name", None)
+
+@pytest.fixture(scope="module")
+def app():
+    with open(APP_PATH, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    ns = {"re": re}
+    exec(compile(ast.Module([node for node in tree.body if _name(node) in NAMES], []), APP_PATH, "exec"), ns)
+    return ns
+
+@pytest.mark.parametrize("theme", ["light", "dark"])
+def test_bundle_drops_whole_font_import(app, theme):
+    css = app["minify_css"](app["get_theme_css"](theme) + app["base_css"] + app["welcome_css"] + app["meshu_css"])
+    assert "@import" not in css
+    assert "display=swap" not in css
+    assert "}h1,h2,h3,h4,h5,h6{font-family:" in css
+
+def test_chatbot_styles_are_plain_css(app):
+    css = app["minify_css"](app["meshu_css"])
+    # lifted out of an f-string template: no doubled braces may remain ("}}" legitimately closes @keyframes)
+    assert "{{" not in css
+    assert "#meshu-toggle-btn{" in css
+    assert css.count("{") == css.count("}")
+
+def test_minify_keeps_descendant_pseudo_class_space(app):
+    assert app["minify_css"]("<style>\n  .a :hover { color: red; }\n</style>") == ".a :hover{color:red}"
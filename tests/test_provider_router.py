@@ -0,0 +1,117 @@
+"""
+Circuit-breaker behaviour of the AI provider router.
+
+app.py is a Streamlit script, so importing it would run the whole page;
+the router classes are compiled straight out of its source instead.
+"""
+import ast
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import pytest
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+NAMES = {"StreamEvent", "StreamCancel", "ProviderHealth", "ProviderRouter", "run_in_thread"}
+
+@pytest.fixture(scope="module")
+def app():
+    with open(APP_PATH, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    module = ast.Module([node for node in tree.body if getattr(node, "name", None) in NAMES], [])
+    ns = {"deque": deque, "queue": queue, "threading": threading, "time": time,
+          "add_script_run_ctx": add_script_run_ctx, "get_script_run_ctx": get_script_run_ctx}
+    exec(compile(module, APP_PATH, "exec"), ns)
+    return ns
+
+class Response:
+    """Stands in for a streaming HTTP response: reads block until it is closed."""
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+def make_router(app, behaviour, calls, cooldown=0.05, stall_timeout=30.0):
+    """Router over providers "a" and "b"; behaviour[name] is "ok", "fail", "slow" or "stall"."""
+    responses = {}
+    def provider(name):
+        def stream(messages, model, cancel):
+            calls.append(name)
+            if behaviour[name] == "fail":
+                raise RuntimeError(f"{name} down")
+            if behaviour[name] == "slow":
+                time.sleep(0.3)
+            if behaviour[name] == "stall":
+                response = responses[name] = cancel.attach(Response())
+                yield "partial "
+                response.closed.wait()
+                raise ConnectionError("response closed")
+            yield f"reply from {name}"
+        return (name.upper(), stream, lambda model: model)
+    router = app["ProviderRouter"]({"a": provider("a"), "b": provider("b")}, hedge_min_delay=0.1,
+                                   hedge_default_delay=0.1, error_rate=0.5, cooldown=cooldown, stall_timeout=stall_timeout)
+    router.responses = responses
+    return router
+
+def open_breaker(health):
+    for _ in range(health.min_samples):
+        health.record(False, 0.0)
+    assert health.state == "open"
+
+def reply(app, router):
+    return "".join(c for c in router.stream([], "model") if not isinstance(c, app["StreamEvent"]))
+
+def test_unlaunched_provider_stays_eligible_after_cooldown(app):
+    behaviour, calls = {"a": "ok", "b": "ok"}, []
+    router = make_router(app, behaviour, calls)
+    open_breaker(router.health["a"])
+    open_breaker(router.health["b"])
+    time.sleep(0.06)
+
+    assert reply(app, router) == "reply from a"
+    assert calls == ["a"]
+    assert router.health["a"].state == "closed"
+    # b was never launched: still open, not a half-open trial that nobody settles
+    assert router.health["b"].state == "open"
+    assert router.health["b"].available()
+
+    behaviour["a"] = "fail"
+    calls.clear()
+    assert reply(app, router) == "reply from b"
+    assert calls == ["a", "b"]
+    assert router.health["b"].state == "closed"
+
+def test_cancelled_hedge_trial_reopens_breaker(app):
+    behaviour, calls = {"a": "slow", "b": "ok"}, []
+    router = make_router(app, behaviour, calls)
+    open_breaker(router.health["a"])
+    time.sleep(0.06)
+
+    # a is the half-open trial but too slow; the b hedge wins and a is cancelled before its first token
+    assert reply(app, router) == "reply from b"
+    deadline = time.monotonic() + 2
+    while router.health["a"].state == "half_open" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert router.health["a"].state == "open"
+    time.sleep(0.06)
+    assert router.health["a"].available()
+
+def test_stalled_winner_fails_over_and_is_closed(app):
+    behaviour, calls = {"a": "stall", "b": "ok"}, []
+    router = make_router(app, behaviour, calls, stall_timeout=0.2)
+
+    chunks = list(router.stream([], "model"))
+    events = [c for c in chunks if isinstance(c, app["StreamEvent"])]
+    assert [e.reset for e in events] == [True]
+    assert chunks[-1] == "reply from b"
+    assert calls == ["a", "b"]
+    # the stalled response was closed, so its pump thread ends instead of blocking on the read
+    assert router.responses["a"].closed.is_set()
+    deadline = time.monotonic() + 2
+    while router.live_calls() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert router.live_calls() == 0
@@ -0,0 +1,237 @@
+"""
+Caching proxy for the map tiles page_maps loads. Tiles are fetched from the
+upstream once, kept on disk under .cache/tiles/<layer>/<z>/<x>/<y>.png and
+served from there until they are older than --max-age days; if the upstream
+is down, a stale tile is served rather than none.
+
+    python tile_proxy.py serve [--port 8780]                  # run the proxy
+    python tile_proxy.py seed --min-zoom 5 --max-zoom 9       # pre-fetch the Pakistan bounding box
+
+Seeding covers the CARTO "voyager" layer by default. The public OSM tile
+servers forbid bulk prefetching (https://operations.osmfoundation.org/policies/tiles/),
+so "osm" can only be seeded once --upstream points it at another server,
+e.g. a self-hosted one or the stub.
+
+Then point the app at it in .streamlit/secrets.toml (the URL must be
+reachable from the browser, not just from the app server):
+
+    tile_proxy_url = "http://127.0.0.1:8780"
+
+For offline tests, run the stub tile server and use it as the upstream:
+
+    python stub_servers.py tiles
+    python tile_proxy.py serve --upstream voyager=http://127.0.0.1:8767/{z}/{x}/{y}.png
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tiles")
+UPSTREAMS = {
+    "voyager": "https://a.basemaps.cartocdn.com/rastertiles/voyager/{z}/{x}/{y}.png",
+    "osm": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+}
+PAKISTAN_BBOX = (60.87, 23.69, 77.84, 37.10)  # west, south, east, north
+USER_AGENT = "Smart-Trip-Planner-TileProxy/1.0"
+SEED_LAYERS = ("voyager",)
+NO_BULK_UPSTREAMS = {UPSTREAMS["osm"]}  # usage policy prohibits prefetching; fine to proxy on demand
+
+def tiles_in_bbox(bbox, zoom):
+    """(x, y) of every Web Mercator tile at `zoom` that intersects bbox."""
+    west, south, east, north = bbox
+    n = 2 ** zoom
+
+    def tile(lon, lat):
+        lat = math.radians(max(min(lat, 85.0511), -85.0511))
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    x0, y0 = tile(west, north)
+    x1, y1 = tile(east, south)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+class TileCache:
+    """On-disk tile store in front of the upstream servers; concurrent misses for one tile share a fetch."""
+    def __init__(self, cache_dir, upstreams, min_zoom, max_zoom, max_age):
+        self.cache_dir = cache_dir
+        self.upstreams = upstreams
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.max_age = max_age
+        self.hits = self.misses = self.stale = self.errors = 0
+        self._locks = [threading.Lock() for _ in range(64)]  # striped per-tile fetch locks
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def path(self, layer, z, x, y):
+        return os.path.join(self.cache_dir, layer, str(z), str(x), f"{y}.png")
+
+    def get(self, layer, z, x, y):
+        """Tile bytes, or None when the zoom is out of range or the tile can't be had at all."""
+        if layer not in self.upstreams or not self.min_zoom <= z <= self.max_zoom or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return None
+        path = self.path(layer, z, x, y)
+        cached = self._read(path)
+        if cached is not None:
+            self._count("hits")
+            return cached
+        with self._tile_lock(path):
+            cached = self._read(path)  # another thread may have fetched it while we waited
+            if cached is not None:
+                self._count("hits")
+                return cached
+            try:
+                body = self._fetch(self.upstreams[layer].format(z=z, x=x, y=y))
+            except requests.RequestException:
+                self._count("errors")
+                body = None
+            if body is None:
+                try:
+                    with open(path, "rb") as f:
+                        self._count("stale")
+                        return f.read()
+                except OSError:
+                    return None
+            self._count("misses")
+            self._write(path, body)
+            return body
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "errors": self.errors,
+                "zoom": [self.min_zoom, self.max_zoom], "layers": sorted(self.upstreams)}
+
+    def _read(self, path):
+        """Cached bytes if present and younger than max_age."""
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _fetch(self, url):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+        resp = session.get(url, timeout=(3.05, 15))
+        if resp.status_code != 200 or not resp.content:
+            self._count("errors")
+            return None
+        return resp.content
+
+    def _write(self, path, body):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    def _tile_lock(self, path):
+        return self._locks[hash(path) % len(self._locks)]
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+class TileHandler(BaseHTTPRequestHandler):
+    """Serves /<layer>/<z>/<x>/<y>.png from the server's TileCache, and /stats as JSON."""
+    def do_GET(self):
+        cache = self.server.tile_cache
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts == ["stats"]:
+            return self._send(200, json.dumps(cache.stats()).encode("utf-8"), "application/json")
+        try:
+            layer, z, x, y = parts[0], int(parts[1]), int(parts[2]), int(parts[3].removesuffix(".png"))
+        except (IndexError, ValueError):
+            return self._send(404, b"not found", "text/plain")
+        body = cache.get(layer, z, x, y)
+        if body is None:
+            return self._send(404, b"tile unavailable", "text/plain")
+        self._send(200, body, "image/png", cache_control=f"public, max-age={int(cache.max_age)}")
+
+    def _send(self, status, body, content_type, cache_control="no-store"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            print(f"[tiles] {self.address_string()} {fmt % args}")
+
+def seed(cache, layers, bbox, workers):
+    """Fetch every tile of bbox in the cache's zoom range that isn't cached yet."""
+    jobs = [(layer, z, x, y) for layer in layers for z in range(cache.min_zoom, cache.max_zoom + 1) for x, y in tiles_in_bbox(bbox, z)]
+    print(f"Seeding {len(jobs)} tiles ({', '.join(layers)}, zoom {cache.min_zoom}-{cache.max_zoom})")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: cache.get(*job) is not None, jobs))
+    stats = cache.stats()
+    print(f"Done in {time.perf_counter() - start:.1f}s: {stats['misses']} fetched, {stats['hits']} already cached, "
+          f"{len(results) - sum(results)} unavailable")
+    return 0 if all(results) else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk-caching proxy for map tiles.")
+    parser.add_argument("command", choices=("serve", "seed"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--min-zoom", type=int, default=0)
+    parser.add_argument("--max-zoom", type=int, help="tiles outside the zoom range are neither served nor seeded "
+                        "(default: 19 for serve, 10 for seed)")
+    parser.add_argument("--max-age", type=float, default=30, help="days before a cached tile is refetched")
+    parser.add_argument("--upstream", action="append", default=[], metavar="LAYER=URL",
+                        help="override or add an upstream, e.g. voyager=http://127.0.0.1:8767/{z}/{x}/{y}.png")
+    parser.add_argument("--layer", action="append", help=f"layers to seed (default: {', '.join(SEED_LAYERS)})")
+    parser.add_argument("--bbox", default=",".join(map(str, PAKISTAN_BBOX)), help="west,south,east,north to seed")
+    parser.add_argument("--workers", type=int, default=4, help="parallel fetches while seeding; keep low for public servers")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    upstreams = dict(UPSTREAMS)
+    for item in args.upstream:
+        layer, _, url = item.partition("=")
+        upstreams[layer] = url
+    max_zoom = args.max_zoom if args.max_zoom is not None else (10 if args.command == "seed" else 19)
+    cache = TileCache(args.cache_dir, upstreams, args.min_zoom, max_zoom, args.max_age * 86400)
+
+    if args.command == "seed":
+        layers = args.layer or list(SEED_LAYERS)
+        refused = [layer for layer in layers if upstreams.get(layer) in NO_BULK_UPSTREAMS]
+        if refused:
+            print(f"Refusing to bulk-seed {', '.join(refused)} from the public OSM tile servers, whose usage policy "
+                  f"prohibits it; point the layer elsewhere with --upstream {refused[0]}=URL", file=sys.stderr)
+            return 2
+        bbox = tuple(float(v) for v in args.bbox.split(","))
+        return seed(cache, layers, bbox, args.workers)
+
+    server = ThreadingHTTPServer((args.host, args.port), TileHandler)
+    server.tile_cache = cache
+    server.verbose = args.verbose
+    print(f"tile proxy listening on http://{args.host}:{server.server_port} (cache: {args.cache_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())